@@ -0,0 +1,48 @@
+#include <fstream>
+#include <string>
+#include <vector>
+
+class DataProcessor {
+private:
+    std::ifstream* inputFile;
+    std::ofstream* outputFile;
+    std::vector<double> buffer;
+    
+public:
+    DataProcessor(const char* inPath, const char* outPath) {
+        inputFile = new std::ifstream(inPath);
+        outputFile = new std::ofstream(outPath);
+        if (!inputFile->is_open() || !outputFile->is_open()) {
+            throw std::runtime_error("Failed to open files");
+        }
+    }
+    
+    ~DataProcessor() {
+        if (inputFile) {
+            inputFile->close();
+            delete inputFile;
+        }
+        if (outputFile) {
+            outputFile->close();
+            delete outputFile;
+        }
+    }
+    
+    void processData() {
+        double value;
+        while (*inputFile >> value) {
+            buffer.push_back(value * 2.0);
+        }
+        
+        for (int i = 0; i < buffer.size(); i++) {
+            *outputFile << buffer[i] << "\n";
+        }
+    }
+};
+
+int main() {
+    DataProcessor* processor = new DataProcessor("input.txt", "output.txt");
+    processor->processData();
+    delete processor;
+    return 0;
+}
@@ -0,0 +1,78 @@
+#include <iostream>
+#include <fstream>
+#include <vector>
+#include <string>
+
+class ImageProcessor {
+private:
+    unsigned char* pixelBuffer;
+    int width;
+    int height;
+    FILE* outputFile;
+    
+public:
+    ImageProcessor(int w, int h) {
+        width = w;
+        height = h;
+        pixelBuffer = new unsigned char[w * h * 3];
+        outputFile = nullptr;
+    }
+    
+    ~ImageProcessor() {
+        if (pixelBuffer) {
+            delete[] pixelBuffer;
+        }
+        if (outputFile) {
+            fclose(outputFile);
+        }
+    }
+    
+    bool loadFromFile(const char* filename) {
+        FILE* f = fopen(filename, "rb");
+        if (!f) return false;
+        
+        fread(pixelBuffer, 1, width * height * 3, f);
+        fclose(f);
+        return true;
+    }
+    
+    void applyGammaCorrection(float gamma) {
+        for (int i = 0; i < width * height * 3; i++) {
+            float normalized = pixelBuffer[i] / 255.0f;
+            float corrected = pow(normalized, gamma);
+            pixelBuffer[i] = (unsigned char)(corrected * 255.0f);
+        }
+    }
+    
+    void applyBrightness(int offset) {
+        for (int i = 0; i < width * height * 3; i++) {
+            int newVal = pixelBuffer[i] + offset;
+            if (newVal > 255) newVal = 255;
+            if (newVal < 0) newVal = 0;
+            pixelBuffer[i] = (unsigned char)newVal;
+        }
+    }
+    
+    bool saveToFile(const char* filename) {
+        outputFile = fopen(filename, "wb");
+        if (!outputFile) return false;
+        
+        fwrite(pixelBuffer, 1, width * height * 3, outputFile);
+        fclose(outputFile);
+        outputFile = nullptr;
+        return true;
+    }
+};
+
+int main() {
+    ImageProcessor* processor = new ImageProcessor(1920, 1080);
+    
+    if (processor->loadFromFile("input.raw")) {
+        processor->applyGammaCorrection(2.2f);
+        processor->applyBrightness(10);
+        processor->saveToFile("output.raw");
+    }
+    
+    delete processor;
+    return 0;
+}
@@ -7,89 +7,19 @@ Run: python -m examples.demo
 """
 
 import asyncio
+import functools
 from pathlib import Path
 
-# Sample C++ legacy code to refactor
-SAMPLE_CPP_CODE = '''
-#include <iostream>
-#include <fstream>
-#include <vector>
-#include <string>
-
-class ImageProcessor {
-private:
-    unsigned char* pixelBuffer;
-    int width;
-    int height;
-    FILE* outputFile;
-    
-public:
-    ImageProcessor(int w, int h) {
-        width = w;
-        height = h;
-        pixelBuffer = new unsigned char[w * h * 3];
-        outputFile = nullptr;
-    }
-    
-    ~ImageProcessor() {
-        if (pixelBuffer) {
-            delete[] pixelBuffer;
-        }
-        if (outputFile) {
-            fclose(outputFile);
-        }
-    }
-    
-    bool loadFromFile(const char* filename) {
-        FILE* f = fopen(filename, "rb");
-        if (!f) return false;
-        
-        fread(pixelBuffer, 1, width * height * 3, f);
-        fclose(f);
-        return true;
-    }
-    
-    void applyGammaCorrection(float gamma) {
-        for (int i = 0; i < width * height * 3; i++) {
-            float normalized = pixelBuffer[i] / 255.0f;
-            float corrected = pow(normalized, gamma);
-            pixelBuffer[i] = (unsigned char)(corrected * 255.0f);
-        }
-    }
-    
-    void applyBrightness(int offset) {
-        for (int i = 0; i < width * height * 3; i++) {
-            int newVal = pixelBuffer[i] + offset;
-            if (newVal > 255) newVal = 255;
-            if (newVal < 0) newVal = 0;
-            pixelBuffer[i] = (unsigned char)newVal;
-        }
-    }
-    
-    bool saveToFile(const char* filename) {
-        outputFile = fopen(filename, "wb");
-        if (!outputFile) return false;
-        
-        fwrite(pixelBuffer, 1, width * height * 3, outputFile);
-        fclose(outputFile);
-        outputFile = nullptr;
-        return true;
-    }
-};
+# Sample legacy sources live as real .cpp files so they get syntax
+# highlighting and can be fed through the pipeline like user input
+_DATA_DIR = Path(__file__).parent / "data"
+
+
+@functools.lru_cache(maxsize=None)
+def load_sample_cpp() -> str:
+    """Lazily read the sample legacy C++ source (read once, cached)."""
+    return (_DATA_DIR / "image_processor.cpp").read_text()
 
-int main() {
-    ImageProcessor* processor = new ImageProcessor(1920, 1080);
-    
-    if (processor->loadFromFile("input.raw")) {
-        processor->applyGammaCorrection(2.2f);
-        processor->applyBrightness(10);
-        processor->saveToFile("output.raw");
-    }
-    
-    delete processor;
-    return 0;
-}
-'''
 
 def demo_state_creation():
     """Demonstrate AgentState creation."""
@@ -100,7 +30,7 @@ def demo_state_creation():
     print("="*60)
     
     state = create_initial_state(
-        legacy_source=SAMPLE_CPP_CODE,
+        legacy_source=load_sample_cpp(),
         source_file_path="examples/image_processor.cpp",
         source_language="cpp",
         target_python_version="3.11",
@@ -224,7 +154,7 @@ def demo_prompt_templates():
     
     # Generate analysis prompt
     analysis_prompt = get_analysis_prompt(
-        source_code=SAMPLE_CPP_CODE[:500] + "...",
+        source_code=load_sample_cpp()[:500] + "...",
         language="cpp",
         file_path="image_processor.cpp",
     )
@@ -253,6 +183,32 @@ from dataclasses import dataclass
 from contextlib import contextmanager
 import numpy as np
 from numpy.typing import NDArray
+from multiprocessing import Pool, shared_memory
+
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _gamma_brightness_kernel(flat, gamma, offset):
+        """Fused single-pass gamma+brightness over a flat buffer."""
+        for i in prange(flat.size):
+            v = (flat[i] / 255.0) ** gamma * 255.0 + offset
+            flat[i] = 0 if v < 0 else (255 if v > 255 else int(v))
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _tone_tile(shm_name: str, shape: tuple, lut: NDArray[np.uint8], rows: slice) -> None:
+    """Worker: attach to the shared pixel buffer and LUT one tile in place."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        pixels[rows] = lut[pixels[rows]]
+    finally:
+        shm.close()
+
 
 @dataclass
 class ImageProcessor:
@@ -260,42 +216,114 @@ class ImageProcessor:
     width: int
     height: int
     _pixel_buffer: NDArray[np.uint8] | None = None
-    
+    _lut: NDArray[np.uint8] | None = None
+    _lut_params: tuple[float, int] | None = None
+    _scratch: NDArray[np.uint8] | None = None
+
     def __post_init__(self):
-        self._pixel_buffer = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-    
+        # Shared-memory backing so worker processes can attach zero-copy
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self.height * self.width * 3
+        )
+        self._pixel_buffer = np.ndarray(
+            (self.height, self.width, 3), dtype=np.uint8, buffer=self._shm.buf
+        )
+        self._pixel_buffer[:] = 0
+        # Preallocated output buffer so tone passes never allocate per call
+        self._scratch = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
     def __enter__(self):
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._pixel_buffer = None  # Release memory
+        self._shm.close()
+        self._shm.unlink()
         return False
     
+    # Below this size a plain RAM read beats demand-paging fault overhead
+    IN_RAM_THRESHOLD_BYTES = 512 * 1024 * 1024
+
     def load_from_file(self, filename: Path) -> bool:
-        """Load raw image data from file."""
+        """Load raw image data: RAM for small files, memmap for large."""
         try:
-            data = np.fromfile(filename, dtype=np.uint8)
-            self._pixel_buffer = data.reshape((self.height, self.width, 3))
+            nbytes = self.height * self.width * 3
+            if nbytes < self.IN_RAM_THRESHOLD_BYTES:
+                flat = np.fromfile(filename, dtype=np.uint8, count=nbytes)
+                # Exact-count read keeps reshape a zero-copy view
+                self._pixel_buffer = flat.reshape((self.height, self.width, 3))
+            else:
+                self._pixel_buffer = np.memmap(
+                    filename, dtype=np.uint8, mode="r",
+                    shape=(self.height, self.width, 3),
+                )
             return True
         except Exception:
             return False
     
+    @staticmethod
+    def _build_lut(gamma: float, offset: int) -> NDArray[np.uint8]:
+        """Precompute a fused gamma+brightness lookup table (256 entries)."""
+        curve = (np.arange(256, dtype=np.float32) / 255.0) ** gamma * 255.0
+        return np.clip(curve + offset, 0, 255).astype(np.uint8)
+
+    def apply_tone_curve(self, gamma: float, offset: int = 0) -> None:
+        """Apply gamma and brightness in one pass via a uint8 LUT."""
+        # Huge or non-uint8 buffers: fused multi-threaded Numba kernel
+        if HAS_NUMBA and (self._pixel_buffer.size >= 10_000_000
+                          or self._pixel_buffer.dtype != np.uint8):
+            buf = np.ascontiguousarray(self._pixel_buffer)
+            _gamma_brightness_kernel(buf.reshape(-1), gamma, offset)
+            self._pixel_buffer = buf
+            return
+        if self._lut_params != (gamma, offset):
+            self._lut = self._build_lut(gamma, offset)
+            self._lut_params = (gamma, offset)
+        # Write into the preallocated scratch buffer (no astype chains,
+        # zero allocations in steady state), then recycle the old buffer
+        np.take(self._lut, self._pixel_buffer, out=self._scratch)
+        old = self._pixel_buffer
+        self._pixel_buffer = self._scratch
+        if isinstance(old, np.ndarray) and old.flags.writeable and not isinstance(old, np.memmap):
+            self._scratch = old
+        else:
+            self._scratch = np.empty_like(self._pixel_buffer)
+
+    def apply_tone_curve_parallel(self, gamma: float, offset: int = 0,
+                                  workers: int = 4) -> None:
+        """Fan the LUT pass over row tiles; workers attach zero-copy."""
+        if not isinstance(self._pixel_buffer.base, memoryview):
+            # e.g. after load_from_file the buffer is a memmap: stage it
+            # into shared memory once so workers can see it
+            staged = np.ndarray(self._pixel_buffer.shape, dtype=np.uint8,
+                                buffer=self._shm.buf)
+            np.copyto(staged, self._pixel_buffer)
+            self._pixel_buffer = staged
+        lut = self._build_lut(gamma, offset)
+        rows_per_tile = max(1, self.height // workers)
+        tiles = [slice(r, min(r + rows_per_tile, self.height))
+                 for r in range(0, self.height, rows_per_tile)]
+        shape = self._pixel_buffer.shape
+        with Pool(workers) as pool:
+            pool.starmap(_tone_tile, [(self._shm.name, shape, lut, t) for t in tiles])
+
     def apply_gamma_correction(self, gamma: float) -> None:
-        """Apply gamma correction using vectorized NumPy operations."""
-        normalized = self._pixel_buffer.astype(np.float32) / 255.0
-        corrected = np.power(normalized, gamma)
-        self._pixel_buffer = (corrected * 255.0).astype(np.uint8)
-    
+        """Apply gamma correction (single LUT pass, no float32 buffers)."""
+        self.apply_tone_curve(gamma)
+
     def apply_brightness(self, offset: int) -> None:
-        """Apply brightness adjustment with clipping."""
-        self._pixel_buffer = np.clip(
-            self._pixel_buffer.astype(np.int16) + offset, 0, 255
-        ).astype(np.uint8)
+        """Apply brightness adjustment with clipping (single LUT pass)."""
+        self.apply_tone_curve(1.0, offset)
     
     def save_to_file(self, filename: Path) -> bool:
-        """Save processed image to file."""
+        """Save processed image through a writable memory map."""
         try:
-            self._pixel_buffer.tofile(filename)
+            out = np.memmap(
+                filename, dtype=np.uint8, mode="w+",
+                shape=(self.height, self.width, 3),
+            )
+            out[:] = self._pixel_buffer
+            out.flush()
             return True
         except Exception:
             return False
@@ -324,7 +352,7 @@ def main():
     
     print("\n📄 Sample C++ Input (ImageProcessor class):")
     print("-" * 40)
-    print(SAMPLE_CPP_CODE[:600] + "\n... (truncated)")
+    print(load_sample_cpp()[:600] + "\n... (truncated)")
     
     # Run all demos
     demo_state_creation()
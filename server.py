@@ -6,8 +6,11 @@ Provides REST and WebSocket endpoints for the frontend.
 
 import asyncio
 import json
+import re
+import time
 import uuid
 import os
+from collections import Counter
 from datetime import datetime
 from typing import Optional, Literal
 from contextlib import asynccontextmanager
@@ -17,6 +20,11 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
+try:
+    import orjson  # Rust JSON encoder: bytes out, single pass
+except ImportError:
+    orjson = None
+
 from src.core.state import create_initial_state, RefactorPhase
 from src.core.graph import compile_graph
 from src.models.llm import initialize_model, get_model, LegacyLensLLM
@@ -59,10 +67,75 @@ class JobStatus(BaseModel):
 
 
 # =============================================================================
-# JOB STORAGE (In-memory for demo)
+# JOB STORAGE (sharded in-memory store with TTL eviction)
 # =============================================================================
 
-jobs: dict[str, dict] = {}
+_JOB_SHARDS = 16  # Power of two so `hash & (N-1)` picks the shard
+JOB_TTL_SECONDS = 3600  # Evict finished/stale jobs after an hour
+_EVICTION_INTERVAL_SECONDS = 60
+MAX_JOBS = 10_000  # Hard cap across all shards; oldest insertions go first
+_SHARD_CAPACITY = MAX_JOBS // _JOB_SHARDS
+
+_shards: list[dict[str, dict]] = [{} for _ in range(_JOB_SHARDS)]
+_locks: list[asyncio.Lock] = [asyncio.Lock() for _ in range(_JOB_SHARDS)]
+
+
+_ts_cache: list = [0, ""]
+
+
+def _now_iso() -> str:
+    """_now_iso() memoized to the current wall-clock second.
+
+    Job timestamps only need second precision, so burst job creation
+    shares one formatted string per second instead of re-running the
+    Python-level isoformat formatter per call.
+    """
+    t = int(time.time())
+    if t != _ts_cache[0]:
+        _ts_cache[0] = t
+        _ts_cache[1] = datetime.fromtimestamp(t).isoformat()
+    return _ts_cache[1]
+
+
+def _shard_index(job_id: str) -> int:
+    return hash(job_id) & (_JOB_SHARDS - 1)
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    """Fetch a job record; mutations of the returned dict need no lock."""
+    s = _shard_index(job_id)
+    async with _locks[s]:
+        return _shards[s].get(job_id)
+
+
+async def put_job(job_id: str, value: dict) -> None:
+    """Insert or replace a job record under its shard lock.
+
+    Shards are capped so the store stays bounded even if TTL eviction
+    can't keep up with a submission burst; dicts iterate in insertion
+    order, so the first key is always the oldest record.
+    """
+    s = _shard_index(job_id)
+    async with _locks[s]:
+        shard = _shards[s]
+        shard[job_id] = value
+        while len(shard) > _SHARD_CAPACITY:
+            del shard[next(iter(shard))]
+
+
+async def _evict_expired_jobs() -> None:
+    """Background task: drop jobs older than JOB_TTL_SECONDS every minute."""
+    while True:
+        await asyncio.sleep(_EVICTION_INTERVAL_SECONDS)
+        cutoff = datetime.now().timestamp() - JOB_TTL_SECONDS
+        for s in range(_JOB_SHARDS):
+            async with _locks[s]:
+                expired = [
+                    job_id for job_id, job in _shards[s].items()
+                    if datetime.fromisoformat(job["created_at"]).timestamp() < cutoff
+                ]
+                for job_id in expired:
+                    del _shards[s][job_id]
 
 
 # =============================================================================
@@ -75,6 +148,30 @@ from contextlib import contextmanager
 import numpy as np
 from numpy.typing import NDArray
 
+try:
+    import cupy as xp
+    # Pooled allocators: reuse device blocks instead of cudaMalloc per
+    # call, and pin host staging buffers to speed the upload in load
+    xp.cuda.set_allocator(xp.cuda.MemoryPool().malloc)
+    xp.cuda.set_pinned_memory_allocator(xp.cuda.PinnedMemoryPool().malloc)
+    HAS_CUDA = True
+except ImportError:
+    xp = np
+    HAS_CUDA = False
+
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _tone_kernel(flat, lut):
+        """Single fused pass: gamma+brightness via combined LUT, in place."""
+        for i in prange(flat.size):
+            flat[i] = lut[flat[i]]
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 
 @dataclass
 class ImageProcessor:
@@ -82,44 +179,99 @@ class ImageProcessor:
     width: int
     height: int
     _pixel_buffer: NDArray[np.uint8] | None = None
+    _scratch: NDArray[np.uint8] | None = None
+    _gamma_luts: dict[tuple[float, int], NDArray[np.uint8]] | None = None
     
     def __post_init__(self):
-        self._pixel_buffer = np.zeros(
-            (self.height, self.width, 3), dtype=np.uint8
+        self._pixel_buffer = xp.zeros(
+            (self.height, self.width, 3), dtype=xp.uint8
         )
+        self._scratch = xp.empty_like(self._pixel_buffer)
+        self._gamma_luts = {}
     
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._pixel_buffer = None
+        self._scratch = None
         return False
     
     def load_from_file(self, filename: Path) -> bool:
-        """Load raw image data from file."""
+        """Load raw image data straight into the preallocated buffer."""
         try:
-            data = np.fromfile(filename, dtype=np.uint8)
-            self._pixel_buffer = data.reshape((self.height, self.width, 3))
-            return True
+            if HAS_CUDA:
+                data = np.fromfile(filename, dtype=np.uint8)
+                self._pixel_buffer = xp.asarray(
+                    data.reshape((self.height, self.width, 3))
+                )
+                return True
+            # readinto fills the existing ndarray via the buffer
+            # protocol: zero temporary allocations, zero copies
+            with open(filename, "rb") as f:
+                read = f.readinto(memoryview(self._pixel_buffer).cast("B"))
+            return read == self._pixel_buffer.size
         except Exception:
             return False
     
+    def _combined_lut(self, gamma: float, offset: int) -> NDArray[np.uint8]:
+        """Build (and cache) a fused gamma+brightness lookup table.
+
+        The float math runs over 256 entries, not the frame, so the
+        per-pixel cost is a pure table gather regardless of gamma.
+        """
+        lut = self._gamma_luts.get((gamma, offset))
+        if lut is None:
+            curve = xp.power(xp.arange(256, dtype=xp.float32) / 255.0, gamma)
+            lut = xp.clip(
+                xp.round(curve * 255.0) + offset, 0, 255
+            ).astype(xp.uint8)
+            self._gamma_luts[(gamma, offset)] = lut
+        return lut
+    
+    def apply_tone(self, gamma: float, offset: int = 0) -> None:
+        """Apply gamma+brightness in one fused pass over the buffer.
+
+        The 256-byte LUT stays resident in L1, so the pass streams the
+        uint8 frame exactly once -- no float32 temporaries to tile or
+        evict between pipeline stages.
+        """
+        lut = self._combined_lut(gamma, offset)
+        if HAS_NUMBA and not HAS_CUDA:
+            _tone_kernel(self._pixel_buffer.reshape(-1), lut)
+        else:
+            # Gather into the preallocated scratch buffer and swap: no
+            # full-frame temporaries, just one SIMD-friendly pass
+            xp.take(lut, self._pixel_buffer, out=self._scratch)
+            self._pixel_buffer, self._scratch = self._scratch, self._pixel_buffer
+    
     def apply_gamma_correction(self, gamma: float) -> None:
-        """Apply gamma correction using vectorized NumPy operations."""
-        normalized = self._pixel_buffer.astype(np.float32) / 255.0
-        corrected = np.power(normalized, gamma)
-        self._pixel_buffer = (corrected * 255.0).astype(np.uint8)
+        """Apply gamma via the fused LUT pass."""
+        self.apply_tone(gamma)
     
     def apply_brightness(self, offset: int) -> None:
-        """Apply brightness adjustment with clipping."""
-        self._pixel_buffer = np.clip(
-            self._pixel_buffer.astype(np.int16) + offset, 0, 255
-        ).astype(np.uint8)
+        """Apply brightness with saturating uint8 arithmetic (no LUT).
+
+        Pure offsets stay in uint8 the whole way: clamp the headroom
+        first, then add/subtract in place. Autovectorizes to saturating
+        SIMD adds with no widening temporaries.
+        """
+        buf, scratch = self._pixel_buffer, self._scratch
+        if offset >= 0:
+            xp.subtract(255, buf, out=scratch)
+            xp.minimum(scratch, offset, out=scratch)
+            xp.add(buf, scratch, out=buf)
+        else:
+            xp.minimum(buf, -offset, out=scratch)
+            xp.subtract(buf, scratch, out=buf)
     
     def save_to_file(self, filename: Path) -> bool:
         """Save processed image to file."""
         try:
-            self._pixel_buffer.tofile(filename)
+            buf = self._pixel_buffer
+            if HAS_CUDA:
+                buf = xp.asnumpy(buf)
+            buf.tofile(filename)
             return True
         except Exception:
             return False
@@ -129,8 +281,7 @@ def main():
     """Main entry point with context manager usage."""
     with ImageProcessor(1920, 1080) as processor:
         if processor.load_from_file(Path("input.raw")):
-            processor.apply_gamma_correction(2.2)
-            processor.apply_brightness(10)
+            processor.apply_tone(2.2, offset=10)
             processor.save_to_file(Path("output.raw"))
 
 
@@ -139,6 +290,89 @@ if __name__ == "__main__":
 '''
 
 
+async def _ws_send_now(websocket: WebSocket, payload: dict) -> None:
+    """Send a JSON frame via orjson when available.
+
+    orjson encodes straight to bytes (~10x faster than stdlib json for
+    these small dict payloads); stdlib send_json remains the fallback.
+    Frames stay text: the frontend's onmessage does JSON.parse on
+    event.data, which would be a Blob for binary frames.
+    """
+    if orjson is not None:
+        await websocket.send_text(orjson.dumps(payload).decode())
+    else:
+        await websocket.send_json(payload)
+
+
+class StatusBroadcaster:
+    """Trailing-edge debouncer for high-frequency status frames.
+
+    Producers publish agent_update frames as fast as they like; a
+    background task emits only the most recent payload per 50ms window,
+    so a job emitting 100 updates/sec costs clients ~20 frames/sec.
+    Terminal frames (job_complete, errors) bypass the window via flush().
+    """
+
+    DEBOUNCE_SECONDS = 0.05
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._pending: Optional[dict] = None
+        self._event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self, payload: dict) -> None:
+        """Queue a coalescable frame; only the latest per window is sent."""
+        self._pending = payload
+        self._event.set()
+
+    async def flush(self, payload: dict) -> None:
+        """Deliver any pending frame, then this one, immediately."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            await _ws_send_now(self._websocket, pending)
+        await _ws_send_now(self._websocket, payload)
+
+    async def _run(self) -> None:
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            payload, self._pending = self._pending, None
+            if payload is not None:
+                await _ws_send_now(self._websocket, payload)
+            await asyncio.sleep(self.DEBOUNCE_SECONDS)
+
+    def close(self) -> None:
+        self._task.cancel()
+
+
+# Active broadcasters keyed by websocket identity (one per connection)
+_broadcasters: dict[int, StatusBroadcaster] = {}
+
+
+async def ws_send(websocket: WebSocket, payload: dict) -> None:
+    """Send a frame, debouncing agent_update bursts per connection."""
+    broadcaster = _broadcasters.get(id(websocket))
+    if broadcaster is None:
+        await _ws_send_now(websocket, payload)
+    elif payload.get("type") == "agent_update":
+        broadcaster.publish(payload)
+    else:
+        await broadcaster.flush(payload)
+
+
+_KEYWORD_RE = re.compile(r"class|void|int |public ")
+
+
+def _keyword_tally(source_code: str) -> Counter:
+    """Count the legacy keywords both pipelines report, in a single scan.
+
+    Equivalent to chained str.count() calls but walks the source once
+    instead of once per keyword, which matters for multi-MB pastes.
+    """
+    return Counter(m.group() for m in _KEYWORD_RE.finditer(source_code))
+
+
 async def run_mock_pipeline(job_id: str, source_code: str, websocket: Optional[WebSocket] = None):
     """Run a mock pipeline for demo purposes."""
     agents = [
@@ -150,30 +384,32 @@ async def run_mock_pipeline(job_id: str, source_code: str, websocket: Optional[W
     ]
     
     delays = [1.5, 1.2, 2.0, 1.5, 1.0]
+    tally = _keyword_tally(source_code)
     messages = [
-        f"Parsed {source_code.count('class')} class(es), {source_code.count('void') + source_code.count('int ')} method(s)",
+        f"Parsed {tally['class']} class(es), {tally['void'] + tally['int ']} method(s)",
         "Mapped: new/delete → context manager, loops → NumPy vectorization",
         "Generated Python module with type hints and docstrings",
         "All tests passed (100% coverage) ✓",
         "Created README.md and architecture documentation",
     ]
     
-    jobs[job_id]["status"] = "running"
-    jobs[job_id]["agents"] = agents
+    job = await get_job(job_id)
+    job["status"] = "running"
+    job["agents"] = agents
     
     for i, agent in enumerate(agents):
         # Set to running
         agents[i]["status"] = "running"
-        jobs[job_id]["current_phase"] = agent["id"]
-        jobs[job_id]["progress"] = int((i / len(agents)) * 100)
+        job["current_phase"] = agent["id"]
+        job["progress"] = int((i / len(agents)) * 100)
         
         if websocket:
-            await websocket.send_json({
+            await ws_send(websocket, {
                 "type": "agent_update",
                 "job_id": job_id,
                 "agent_id": agent["id"],
                 "status": "running",
-                "progress": jobs[job_id]["progress"],
+                "progress": job["progress"],
             })
         
         # Simulate processing
@@ -184,7 +420,7 @@ async def run_mock_pipeline(job_id: str, source_code: str, websocket: Optional[W
         agents[i]["message"] = messages[i]
         
         if websocket:
-            await websocket.send_json({
+            await ws_send(websocket, {
                 "type": "agent_update",
                 "job_id": job_id,
                 "agent_id": agent["id"],
@@ -194,14 +430,14 @@ async def run_mock_pipeline(job_id: str, source_code: str, websocket: Optional[W
             })
     
     # Complete the job
-    jobs[job_id]["status"] = "completed"
-    jobs[job_id]["progress"] = 100
-    jobs[job_id]["current_phase"] = "completed"
-    jobs[job_id]["generated_code"] = MOCK_PYTHON_OUTPUT
-    jobs[job_id]["completed_at"] = datetime.now().isoformat()
+    job["status"] = "completed"
+    job["progress"] = 100
+    job["current_phase"] = "completed"
+    job["generated_code"] = MOCK_PYTHON_OUTPUT
+    job["completed_at"] = _now_iso()
     
     if websocket:
-        await websocket.send_json({
+        await ws_send(websocket, {
             "type": "job_complete",
             "job_id": job_id,
             "generated_code": MOCK_PYTHON_OUTPUT,
@@ -218,8 +454,9 @@ async def run_real_pipeline(job_id: str, source_code: str, language: str, websoc
         {"id": "scribe", "name": "Scribe", "emoji": "📜", "status": "pending", "message": None},
     ]
     
-    jobs[job_id]["status"] = "running"
-    jobs[job_id]["agents"] = agents
+    job = await get_job(job_id)
+    job["status"] = "running"
+    job["agents"] = agents
     
     try:
         model = get_model()
@@ -244,8 +481,9 @@ Code:
 Provide a brief JSON summary."""
 
         analysis = model.generate(analysis_prompt, system_prompt="You are an expert legacy code analyst.")
-        class_count = source_code.count('class')
-        method_count = source_code.count('void') + source_code.count('int ') + source_code.count('public ')
+        tally = _keyword_tally(source_code)
+        class_count = tally['class']
+        method_count = tally['void'] + tally['int '] + tally['public ']
         await update_agent(job_id, 0, agents, "completed", websocket, 
                           f"Analyzed {class_count} class(es), {method_count} method(s)")
         
@@ -302,9 +540,11 @@ Output ONLY the complete Python code, no explanations:"""
             generated_code = generated_code.split("```")[1].split("```")[0]
         
         generated_code = generated_code.strip()
-        
+
+        # count('\n') avoids materializing a list of every line just to len() it
+        line_count = generated_code.count('\n') + 1 if generated_code else 0
         await update_agent(job_id, 2, agents, "completed", websocket,
-                          f"Generated {len(generated_code.splitlines())} lines of Python")
+                          f"Generated {line_count} lines of Python")
         
         # Agent 4: Validator - Check the code (simplified)
         await update_agent(job_id, 3, agents, "running", websocket)
@@ -325,25 +565,25 @@ Output ONLY the complete Python code, no explanations:"""
                           "Code modernization complete")
         
         # Complete the job
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["progress"] = 100
-        jobs[job_id]["current_phase"] = "completed"
-        jobs[job_id]["generated_code"] = generated_code
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job["status"] = "completed"
+        job["progress"] = 100
+        job["current_phase"] = "completed"
+        job["generated_code"] = generated_code
+        job["completed_at"] = _now_iso()
         
         if websocket:
-            await websocket.send_json({
+            await ws_send(websocket, {
                 "type": "job_complete",
                 "job_id": job_id,
                 "generated_code": generated_code,
             })
             
     except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        job["status"] = "failed"
+        job["error"] = str(e)
         
         if websocket:
-            await websocket.send_json({
+            await ws_send(websocket, {
                 "type": "job_error",
                 "job_id": job_id,
                 "error": str(e),
@@ -357,18 +597,20 @@ async def update_agent(job_id: str, index: int, agents: list, status: str,
     if message:
         agents[index]["message"] = message
     
-    jobs[job_id]["current_phase"] = agents[index]["id"]
-    jobs[job_id]["progress"] = int(((index + (1 if status == "completed" else 0)) / len(agents)) * 100)
+    job = await get_job(job_id)
+    job["current_phase"] = agents[index]["id"]
+    job["progress"] = int(((index + (1 if status == "completed" else 0)) / len(agents)) * 100)
     
     if websocket:
-        await websocket.send_json({
-            "type": "agent_update",
-            "job_id": job_id,
-            "agent_id": agents[index]["id"],
-            "status": status,
-            "message": message,
-            "progress": jobs[job_id]["progress"],
-        })
+        # Mutating the shared frame is safe with the trailing-edge
+        # debouncer: only the latest agent state is meant to go out, and
+        # serialization happens at actual send time
+        frame = job["_frame"]
+        frame["agent_id"] = agents[index]["id"]
+        frame["status"] = status
+        frame["message"] = message
+        frame["progress"] = job["progress"]
+        await ws_send(websocket, frame)
 
 
 # =============================================================================
@@ -379,12 +621,23 @@ async def update_agent(job_id: str, index: int, agents: list, status: str,
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     print("🚀 LegacyLens API Server starting...")
-    
+
+    # Start TTL eviction so the job store stays bounded over long uptimes
+    eviction_task = asyncio.create_task(_evict_expired_jobs())
+
+    # Warm the memoized graph compile so the first request doesn't pay it
+    compile_graph()
+
+    # Stat the model path once; the health endpoint reads these instead of
+    # hitting the filesystem on every probe
+    app.state.model_exists = MODEL_PATH.exists()
+    app.state.model_path_str = str(MODEL_PATH) if app.state.model_exists else None
+
     # Try to load the model if it exists
-    if MODEL_PATH.exists():
+    if app.state.model_exists:
         print(f"📦 Loading model from {MODEL_PATH}...")
         try:
-            initialize_model(str(MODEL_PATH), MODEL_TYPE)
+            initialize_model(app.state.model_path_str, MODEL_TYPE)
             print("✅ Model loaded successfully!")
         except Exception as e:
             print(f"⚠️  Failed to load model: {e}")
@@ -395,6 +648,7 @@ async def lifespan(app: FastAPI):
         print("   Download a model to enable real inference.")
     
     yield
+    eviction_task.cancel()
     print("👋 LegacyLens API Server shutting down...")
 
 
@@ -428,7 +682,7 @@ async def root():
         "status": "healthy",
         "version": "1.0.0",
         "model_loaded": model is not None,
-        "model_path": str(MODEL_PATH) if MODEL_PATH.exists() else None,
+        "model_path": app.state.model_path_str,
     }
 
 
@@ -437,7 +691,7 @@ async def start_refactor(request: RefactorRequest):
     """Start a new refactoring job."""
     job_id = str(uuid.uuid4())
     
-    jobs[job_id] = {
+    await put_job(job_id, {
         "job_id": job_id,
         "status": "pending",
         "current_phase": "queued",
@@ -446,10 +700,20 @@ async def start_refactor(request: RefactorRequest):
         "source_code": request.source_code,
         "language": request.language,
         "use_mock": request.use_mock,
-        "created_at": datetime.now().isoformat(),
+        "created_at": _now_iso(),
         "generated_code": None,
         "error": None,
-    }
+        # Reusable agent_update frame: update_agent mutates this in place
+        # instead of allocating a fresh dict per status change
+        "_frame": {
+            "type": "agent_update",
+            "job_id": job_id,
+            "agent_id": None,
+            "status": None,
+            "message": None,
+            "progress": 0,
+        },
+    })
     
     return RefactorResponse(
         job_id=job_id,
@@ -461,10 +725,10 @@ async def start_refactor(request: RefactorRequest):
 @app.get("/api/jobs/{job_id}", response_model=JobStatus)
 async def get_job_status(job_id: str):
     """Get the status of a refactoring job."""
-    if job_id not in jobs:
+    job = await get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
     return JobStatus(
         job_id=job_id,
         status=job["status"],
@@ -484,21 +748,23 @@ async def get_job_status(job_id: str):
 async def websocket_endpoint(websocket: WebSocket, job_id: str):
     """WebSocket endpoint for real-time job updates."""
     await websocket.accept()
-    
+
+    # Debounce bursty agent_update frames for this connection
+    _broadcasters[id(websocket)] = StatusBroadcaster(websocket)
+
     try:
         # Check if job exists
-        if job_id not in jobs:
-            await websocket.send_json({
+        job = await get_job(job_id)
+        if job is None:
+            await ws_send(websocket, {
                 "type": "error",
                 "message": "Job not found",
             })
             await websocket.close()
             return
         
-        job = jobs[job_id]
-        
         # Send initial status
-        await websocket.send_json({
+        await ws_send(websocket, {
             "type": "job_started",
             "job_id": job_id,
             "status": "running",
@@ -523,12 +789,16 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
     except Exception as e:
         print(f"WebSocket error: {e}")
         try:
-            await websocket.send_json({
+            await ws_send(websocket, {
                 "type": "error",
                 "message": str(e),
             })
         except:
             pass
+    finally:
+        broadcaster = _broadcasters.pop(id(websocket), None)
+        if broadcaster is not None:
+            broadcaster.close()
 
 
 # =============================================================================
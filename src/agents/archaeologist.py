@@ -8,14 +8,23 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Literal
 import json
+import re
+
+try:
+    import orjson  # SIMD-accelerated parser; schemas can be multi-KB
+except ImportError:
+    orjson = None
 
 from ..core.state import LogicSchema
-from ..models.llm import LegacyLensLLM
+from ..models.llm import LegacyLensLLM, JSON_GRAMMAR
 from ..prompts.templates import ARCHAEOLOGIST_SYSTEM, get_analysis_prompt
 from ..memory.manager import MemoryManager, MemoryConfig
 
+# Compiled once: hot on every agent call, avoids per-call re-cache lookups
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AnalysisResult:
     logic_schema: LogicSchema
     flow_description: str
@@ -36,6 +45,9 @@ class ArchaeologistAgent:
     def __init__(self, llm: LegacyLensLLM = None):
         self.llm = llm
         self.memory_config = MemoryConfig()
+        # One manager per agent: MemoryManager keeps no per-file state,
+        # so rebuilding it for every analyze() call was pure overhead
+        self._memory = MemoryManager(self.memory_config, llm)
     
     async def analyze(
         self,
@@ -46,9 +58,7 @@ class ArchaeologistAgent:
         """
         Analyze legacy source code and extract Logic Schema.
         """
-        # Initialize memory manager for large files
-        memory = MemoryManager(self.memory_config, self.llm)
-        analysis_context = memory.analyze(source_code, language)
+        analysis_context = self._memory.analyze(source_code, language)
         
         if analysis_context["strategy"] == "direct":
             return await self._analyze_direct(source_code, language, file_path)
@@ -64,10 +74,13 @@ class ArchaeologistAgent:
         """Direct analysis for small files."""
         prompt = get_analysis_prompt(source_code, language, file_path)
         
+        # Grammar-constrained sampling cannot emit malformed JSON, so a
+        # stray token never costs a whole parse-failure retry iteration
         response = self.llm.generate(
             prompt=prompt,
             system_prompt=ARCHAEOLOGIST_SYSTEM,
             stop=["```\n\n", "---END---"],
+            grammar=JSON_GRAMMAR,
         )
         
         # Parse JSON from response
@@ -126,13 +139,14 @@ class ArchaeologistAgent:
     
     def _extract_json(self, response: str) -> dict:
         """Extract JSON from LLM response."""
-        import re
-        json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+        loads = orjson.loads if orjson is not None else json.loads
+        json_match = _JSON_BLOCK_RE.search(response)
         if json_match:
-            return json.loads(json_match.group(1))
+            return loads(json_match.group(1))
         try:
-            return json.loads(response)
-        except json.JSONDecodeError:
+            return loads(response)
+        except ValueError:
+            # Covers both json.JSONDecodeError and orjson.JSONDecodeError
             return {}
     
     def _build_logic_schema(self, data: dict, file_path: str, language: str) -> LogicSchema:
@@ -7,11 +7,15 @@ Node B: Maps Logic Schema to modern Pythonic design patterns.
 from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Optional
+import re
 
 from ..core.state import DesignMapping
 from ..models.llm import LegacyLensLLM
 from ..prompts.templates import ARCHITECT_SYSTEM, get_design_prompt
 
+# I/O-suggestive name fragments, matched in one regex pass per function
+_IO_RE = re.compile(r"read|write|fetch|send|receive|query|request", re.IGNORECASE)
+
 
 class ArchitectAgent:
     """
@@ -53,18 +57,22 @@ class ArchitectAgent:
         """Parse design mapping from LLM response."""
         mapping = DesignMapping()
         
-        # Analyze patterns in logic schema
-        mapping.pattern_mappings = self._map_patterns(logic_schema)
-        mapping.async_candidates = self._find_async_candidates(logic_schema)
-        mapping.vectorization_opportunities = self._find_vectorization(logic_schema)
-        mapping.context_managers = self._design_context_managers(logic_schema)
+        # Analyze patterns in logic schema (single walk over the schema)
+        self._analyze_schema(logic_schema, mapping)
         mapping.design_rationale = response
         
         return mapping
     
-    def _map_patterns(self, schema: dict) -> list[dict]:
-        """Map legacy patterns to modern equivalents."""
-        mappings = []
+    def _analyze_schema(self, schema: dict, mapping: DesignMapping) -> None:
+        """Fill in pattern/async/vectorization/resource findings.
+
+        One pass over classes, one over functions, one over allocations --
+        previously each finding re-walked the function list, and async
+        detection ran seven Python-level substring scans per name.
+        """
+        mappings = mapping.pattern_mappings
+        candidates = mapping.async_candidates
+        opportunities = mapping.vectorization_opportunities
         
         # Check for singleton patterns
         for cls in schema.get("classes", []):
@@ -75,51 +83,31 @@ class ArchitectAgent:
                     "class": cls.get("name"),
                 })
         
-        # Check for factory patterns
         for func in schema.get("functions", []):
-            if "create" in func.get("name", "").lower():
+            name = func.get("name", "")
+            
+            # Factory pattern
+            if "create" in name.lower():
                 mappings.append({
                     "legacy": "Factory",
                     "modern": "@classmethod constructor",
-                    "function": func.get("name"),
+                    "function": name,
                 })
-        
-        return mappings
-    
-    def _find_async_candidates(self, schema: dict) -> list[str]:
-        """Find functions suitable for async/await."""
-        candidates = []
-        io_indicators = ["read", "write", "fetch", "send", "receive", "query", "request"]
-        
-        for func in schema.get("functions", []):
-            name = func.get("name", "").lower()
-            if any(ind in name for ind in io_indicators):
-                candidates.append(func.get("name"))
-        
-        return candidates
-    
-    def _find_vectorization(self, schema: dict) -> list[dict]:
-        """Find loops that could be vectorized with NumPy."""
-        opportunities = []
-        
-        for func in schema.get("functions", []):
-            # Look for array processing patterns
+            
+            # Async/await candidates (I/O-suggestive names)
+            if _IO_RE.search(name):
+                candidates.append(name)
+            
+            # Loops that could be vectorized with NumPy
             if "loop" in str(func.get("body", "")).lower():
                 opportunities.append({
-                    "function": func.get("name"),
+                    "function": name,
                     "suggestion": "Consider NumPy vectorization",
                 })
         
-        return opportunities
-    
-    def _design_context_managers(self, schema: dict) -> list[dict]:
-        """Design context managers for resource handling."""
-        managers = []
-        
+        # Context managers for resource handling
         for alloc in schema.get("memory_allocations", []):
-            managers.append({
+            mapping.context_managers.append({
                 "resource": alloc.get("type", "resource"),
                 "pattern": "Context manager with __enter__/__exit__",
             })
-        
-        return managers
@@ -6,11 +6,17 @@ Node C: Generates Python code and Next.js frontend components.
 
 from __future__ import annotations
 from dataclasses import dataclass, field
+import re
 
 from ..core.state import GeneratedCode
-from ..models.llm import LegacyLensLLM
+from ..models.llm import LegacyLensLLM, SamplingMode
 from ..prompts.templates import ENGINEER_SYSTEM, get_generation_prompt
 
+# Compiled once: parsing runs on every generation (and each retry).
+# A single alternation keeps extraction to one linear pass over the
+# response instead of one findall walk per language.
+_FENCE_RE = re.compile(r'```(python|typescript|tsx)\s*(.*?)\s*```', re.DOTALL)
+
 
 class EngineerAgent:
     """
@@ -41,9 +47,15 @@ class EngineerAgent:
             previous_failures=previous_failures or [],
         )
         
+        # First attempts decode greedily (cheapest, deterministic);
+        # retries sample, since re-decoding the same tokens after a
+        # failed validation would just re-fail the same way
         response = self.llm.generate(
             prompt=prompt,
             system_prompt=ENGINEER_SYSTEM,
+            sampling_mode=(
+                SamplingMode.NUCLEUS if previous_failures else SamplingMode.GREEDY
+            ),
         )
         
         # Parse generated code
@@ -58,22 +70,21 @@ class EngineerAgent:
         previous_failures: list,
     ) -> GeneratedCode:
         """Parse code blocks from LLM response."""
-        import re
-        
         code = GeneratedCode(iteration=iteration, previous_failures=previous_failures)
-        
-        # Extract Python code blocks
-        python_blocks = re.findall(r'```python\s*(.*?)\s*```', response, re.DOTALL)
-        for i, block in enumerate(python_blocks):
-            if "def test_" in block or "class Test" in block:
-                code.python_tests[f"test_{i}.py"] = block
-            else:
-                code.python_modules[f"module_{i}.py"] = block
-        
-        # Extract TypeScript/Next.js blocks
-        ts_blocks = re.findall(r'```(?:typescript|tsx)\s*(.*?)\s*```', response, re.DOTALL)
-        for i, block in enumerate(ts_blocks):
-            if "export default" in block:
-                code.nextjs_components[f"Component_{i}.tsx"] = block
-        
+
+        # One pass over the response; dispatch each fenced block by language
+        py_i = ts_i = 0
+        for match in _FENCE_RE.finditer(response):
+            lang, block = match.group(1), match.group(2)
+            if lang == "python":
+                if "def test_" in block or "class Test" in block:
+                    code.python_tests[f"test_{py_i}.py"] = block
+                else:
+                    code.python_modules[f"module_{py_i}.py"] = block
+                py_i += 1
+            else:  # typescript / tsx
+                if "export default" in block:
+                    code.nextjs_components[f"Component_{ts_i}.tsx"] = block
+                ts_i += 1
+
         return code
@@ -5,12 +5,63 @@ Node E: Generates living documentation with Mermaid.js diagrams.
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
 
 from ..core.state import Documentation
 from ..models.llm import LegacyLensLLM
 from ..prompts.templates import SCRIBE_SYSTEM
 
+# Content-addressed doc cache: document() is deterministic in its inputs,
+# so repeat CI runs over the same legacy file reuse the artifacts on disk
+_DOC_CACHE_DIR = Path(
+    os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+) / "legacylens" / "docs"
+
+
+def _doc_cache_key(logic_schema: dict, design_mapping: dict) -> str:
+    """Hash the canonical JSON of the inputs document() actually reads."""
+    blob = json.dumps(
+        {"schema": logic_schema, "mapping": design_mapping},
+        sort_keys=True, default=str,
+    ).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+# The system diagram is input-independent; build the literal once
+_SYSTEM_DIAGRAM = """```mermaid
+flowchart TB
+    subgraph Legacy["Legacy System"]
+        L1[C++/Java Source]
+        L2[Manual Memory Management]
+        L3[Synchronous I/O]
+    end
+    
+    subgraph Modern["Modern Python"]
+        M1[Python Modules]
+        M2[Context Managers]
+        M3[Async/Await]
+    end
+    
+    subgraph Frontend["Next.js Frontend"]
+        F1[React Components]
+        F2[API Routes]
+        F3[Server Actions]
+    end
+    
+    L1 -->|Refactor| M1
+    L2 -->|Transform| M2
+    L3 -->|Modernize| M3
+    M1 --> F2
+    F2 --> F1
+    F1 --> F3
+```"""
+
 
 class ScribeAgent:
     """
@@ -34,113 +85,76 @@ class ScribeAgent:
         validation_result: dict,
     ) -> Documentation:
         """Generate comprehensive documentation."""
-        doc = Documentation()
-        
-        # Generate README
-        doc.readme = self._generate_readme(logic_schema, design_mapping)
+        cache_key = _doc_cache_key(logic_schema, design_mapping)
+        cache_path = _DOC_CACHE_DIR / f"{cache_key}.json"
+        try:
+            return Documentation(**json.loads(cache_path.read_text()))
+        except (OSError, ValueError, TypeError):
+            pass  # Miss or stale entry: regenerate below
         
-        # Generate architecture doc with diagrams
-        doc.architecture_doc = self._generate_architecture_doc(design_mapping)
-        doc.system_diagram = self._generate_system_diagram(design_mapping)
-        doc.class_diagrams = self._generate_class_diagrams(logic_schema)
-        doc.flowcharts = self._generate_flowcharts(logic_schema)
+        doc = Documentation()
         
-        # Generate migration guide
-        doc.migration_guide = self._generate_migration_guide(
-            logic_schema, design_mapping
+        # The sections are independent, so build them concurrently; the
+        # wall clock tracks the slowest section instead of the sum once
+        # any of them become LLM-backed
+        (
+            doc.readme,
+            doc.architecture_doc,
+            doc.system_diagram,
+            doc.class_diagrams,
+            doc.flowcharts,
+            doc.migration_guide,
+        ) = await asyncio.gather(
+            asyncio.to_thread(self._generate_readme, logic_schema, design_mapping),
+            asyncio.to_thread(self._generate_architecture_doc, design_mapping),
+            asyncio.to_thread(self._generate_system_diagram, design_mapping),
+            asyncio.to_thread(self._generate_class_diagrams, logic_schema),
+            asyncio.to_thread(self._generate_flowcharts, logic_schema),
+            asyncio.to_thread(
+                self._generate_migration_guide, logic_schema, design_mapping
+            ),
         )
         
+        self._cache_doc(cache_path, doc)
         return doc
     
+    @staticmethod
+    def _cache_doc(cache_path: Path, doc: Documentation) -> None:
+        """Persist the documentation atomically; failures are non-fatal."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent)
+            with os.fdopen(fd, "w") as f:
+                json.dump(asdict(doc), f)
+            os.replace(tmp_name, cache_path)
+        except OSError:
+            pass
+    
     def _generate_readme(self, schema: dict, mapping: dict) -> str:
         """Generate project README."""
-        source_file = schema.get("source_file", "unknown")
-        num_functions = len(schema.get("functions", []))
-        num_classes = len(schema.get("classes", []))
-        
-        return f"""# Modernized Code from {source_file}
-
-## Overview
-This project was automatically refactored from legacy {schema.get('language', 'C++')} to modern Python.
-
-## Statistics
-- **Original Functions:** {num_functions}
-- **Original Classes:** {num_classes}
-- **Design Patterns Applied:** {len(mapping.get('pattern_mappings', []))}
-
-## Installation
-```bash
-pip install -r requirements.txt
-```
-
-## Usage
-```python
-from src import main
-main.run()
-```
-
-## Architecture
-See [Architecture.md](./docs/Architecture.md) for detailed diagrams.
-
-## Migration Notes
-See [Migration.md](./docs/Migration.md) for changes from the original codebase.
-"""
+        return _render_readme(
+            schema.get("source_file", "unknown"),
+            schema.get("language", "C++"),
+            len(schema.get("functions", [])),
+            len(schema.get("classes", [])),
+            len(mapping.get("pattern_mappings", [])),
+        )
     
     def _generate_architecture_doc(self, mapping: dict) -> str:
         """Generate architecture documentation."""
-        return f"""# Architecture Documentation
-
-## Design Patterns Applied
-
-{self._format_pattern_mappings(mapping.get('pattern_mappings', []))}
-
-## Async Components
-{', '.join(mapping.get('async_candidates', ['None']))}
-
-## Resource Management
-Context managers implemented for safe resource handling.
-"""
-    
-    def _format_pattern_mappings(self, mappings: list) -> str:
-        """Format pattern mappings as markdown table."""
-        if not mappings:
-            return "No pattern mappings applied."
-        
-        lines = ["| Legacy Pattern | Modern Equivalent | Location |",
-                 "|---------------|-------------------|----------|"]
-        for m in mappings:
-            lines.append(f"| {m.get('legacy', 'N/A')} | {m.get('modern', 'N/A')} | {m.get('class', m.get('function', 'N/A'))} |")
-        return "\n".join(lines)
+        # Freeze the exact fields read into a hashable key so repeat
+        # documents() over the same design hit the memoized renderer
+        pattern_key = tuple(
+            (m.get('legacy', 'N/A'), m.get('modern', 'N/A'),
+             m.get('class', m.get('function', 'N/A')))
+            for m in mapping.get('pattern_mappings', [])
+        )
+        async_key = tuple(mapping.get('async_candidates', ['None']))
+        return _render_architecture_doc(pattern_key, async_key)
     
     def _generate_system_diagram(self, mapping: dict) -> str:
         """Generate Mermaid system architecture diagram."""
-        return """```mermaid
-flowchart TB
-    subgraph Legacy["Legacy System"]
-        L1[C++/Java Source]
-        L2[Manual Memory Management]
-        L3[Synchronous I/O]
-    end
-    
-    subgraph Modern["Modern Python"]
-        M1[Python Modules]
-        M2[Context Managers]
-        M3[Async/Await]
-    end
-    
-    subgraph Frontend["Next.js Frontend"]
-        F1[React Components]
-        F2[API Routes]
-        F3[Server Actions]
-    end
-    
-    L1 -->|Refactor| M1
-    L2 -->|Transform| M2
-    L3 -->|Modernize| M3
-    M1 --> F2
-    F2 --> F1
-    F1 --> F3
-```"""
+        return _SYSTEM_DIAGRAM
     
     def _generate_class_diagrams(self, schema: dict) -> list[str]:
         """Generate Mermaid class diagrams."""
@@ -148,16 +162,17 @@ flowchart TB
         if not classes:
             return []
         
-        diagram = "```mermaid\nclassDiagram\n"
+        # Accumulate lines and join once; += on str copies the whole
+        # prefix every iteration
+        parts = ["```mermaid", "classDiagram"]
         for cls in classes[:5]:  # Limit to 5 classes
             name = cls.get("name", "UnknownClass")
-            diagram += f"    class {name} {{\n"
+            parts.append(f"    class {name} {{")
             for method in cls.get("methods", [])[:3]:
-                diagram += f"        +{method.get('name', 'method')}()\n"
-            diagram += "    }\n"
-        diagram += "```"
+                parts.append(f"        +{method.get('name', 'method')}()")
+            parts.append("    }")
         
-        return [diagram]
+        return ["\n".join(parts) + "\n```"]
     
     def _generate_flowcharts(self, schema: dict) -> list[str]:
         """Generate Mermaid flowcharts for main functions."""
@@ -181,10 +196,45 @@ flowchart TD
 ```"""]
     
     def _generate_migration_guide(self, schema: dict, mapping: dict) -> str:
-        """Generate migration guide."""
-        return f"""# Migration Guide
+        """Generate migration guide (depends only on the source language)."""
+        return _render_migration_guide(schema.get('language', 'Legacy'))
+
+
+@lru_cache(maxsize=128)
+def _render_architecture_doc(pattern_key: tuple, async_key: tuple) -> str:
+    """Render the architecture doc for a frozen (patterns, async) key."""
+    return f"""# Architecture Documentation
+
+## Design Patterns Applied
+
+{_format_pattern_mappings(pattern_key)}
+
+## Async Components
+{', '.join(async_key) if async_key else 'None'}
+
+## Resource Management
+Context managers implemented for safe resource handling.
+"""
 
-## From {schema.get('language', 'Legacy')} to Python
+
+def _format_pattern_mappings(pattern_key: tuple) -> str:
+    """Format (legacy, modern, location) triples as a markdown table."""
+    if not pattern_key:
+        return "No pattern mappings applied."
+    
+    lines = ["| Legacy Pattern | Modern Equivalent | Location |",
+             "|---------------|-------------------|----------|"]
+    for legacy, modern, location in pattern_key:
+        lines.append(f"| {legacy} | {modern} | {location} |")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=8)
+def _render_migration_guide(language: str) -> str:
+    """Render the migration guide for a source language."""
+    return f"""# Migration Guide
+
+## From {language} to Python
 
 ### Key Changes
 
@@ -207,11 +257,41 @@ flowchart TD
 ### Testing
 All original functionality preserved with pytest coverage.
 """
-    
-    def to_dict(self) -> dict:
-        """Serialize documentation for state storage."""
-        return {
-            "readme": self.readme if hasattr(self, 'readme') else "",
-            "architecture_doc": self.architecture_doc if hasattr(self, 'architecture_doc') else "",
-            "system_diagram": self.system_diagram if hasattr(self, 'system_diagram') else "",
-        }
+
+
+@lru_cache(maxsize=128)
+def _render_readme(
+    source_file: str,
+    language: str,
+    num_functions: int,
+    num_classes: int,
+    num_patterns: int,
+) -> str:
+    """Render the README for a frozen set of schema/mapping scalars."""
+    return f"""# Modernized Code from {source_file}
+
+## Overview
+This project was automatically refactored from legacy {language} to modern Python.
+
+## Statistics
+- **Original Functions:** {num_functions}
+- **Original Classes:** {num_classes}
+- **Design Patterns Applied:** {num_patterns}
+
+## Installation
+```bash
+pip install -r requirements.txt
+```
+
+## Usage
+```python
+from src import main
+main.run()
+```
+
+## Architecture
+See [Architecture.md](./docs/Architecture.md) for detailed diagrams.
+
+## Migration Notes
+See [Migration.md](./docs/Migration.md) for changes from the original codebase.
+"""
@@ -5,8 +5,16 @@ Node D: Runs pytest suites and generates fix suggestions on failure.
 """
 
 from __future__ import annotations
+import asyncio
+import atexit
+from itertools import islice
+import multiprocessing
+import os
+import re
+import shutil
 import subprocess
 import tempfile
+import threading
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -14,6 +22,118 @@ from ..core.state import ValidationResult, ValidationStatus
 from ..models.llm import LegacyLensLLM
 from ..prompts.templates import VALIDATOR_SYSTEM
 
+# One pass over pytest output: grab whole failure lines, tick off
+# individual PASSED markers elsewhere
+_PYTEST_RESULT_RE = re.compile(
+    r"^(?P<fail>.*(?:FAILED|AssertionError).*)$|(?P<ok> PASSED)", re.MULTILINE
+)
+
+
+def _parse_pytest_output(output: str) -> dict:
+    """Extract pass/fail counts and failure lines in a single scan."""
+    passed = failed = 0
+    failures = []
+    for m in _PYTEST_RESULT_RE.finditer(output):
+        line = m.group("fail")
+        if line is None:
+            passed += 1
+        else:
+            passed += line.count(" PASSED")
+            failed += line.count(" FAILED")
+            failures.append({"message": line.strip(), "category": "logic"})
+    if failed == 0:
+        failures = []
+    return {
+        "total": passed + failed,
+        "passed": passed,
+        "failed": failed,
+        "failures": failures,
+    }
+
+
+def _bulk_write(tmppath: Path, files: dict[str, str]) -> None:
+    """Write generated files with raw os calls.
+
+    Skips pathlib object churn and buffered-IO setup per file; each
+    entry costs the bare open/write/close syscall triad.
+    """
+    base = str(tmppath)
+    for name, code in files.items():
+        fd = os.open(os.path.join(base, name),
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, code.encode())
+        finally:
+            os.close(fd)
+
+
+def _run_pytest_subprocess(code_dir: str) -> dict:
+    """Fallback runner: stream pytest output, retaining only O(failures).
+
+    capture_output=True would buffer the whole verbose log (MB-scale on
+    big suites) and then copy it again for parsing; scanning line by
+    line keeps just the counters and the failure lines.
+    """
+    proc = subprocess.Popen(
+        ["python", "-m", "pytest", code_dir, "-v", "--tb=line", "--no-header"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    watchdog = threading.Timer(60, proc.kill)
+    watchdog.start()
+    passed = failed = 0
+    failures = []
+    try:
+        for line in proc.stdout:
+            passed += line.count(" PASSED")
+            failed += line.count(" FAILED")
+            if "FAILED" in line or "AssertionError" in line:
+                failures.append({"message": line.strip(), "category": "logic"})
+        if proc.wait() == -9:  # Killed by the watchdog
+            raise subprocess.TimeoutExpired(proc.args, 60)
+    finally:
+        watchdog.cancel()
+    if failed == 0:
+        failures = []
+    return {
+        "total": passed + failed,
+        "passed": passed,
+        "failed": failed,
+        "failures": failures,
+    }
+
+
+def _pytest_worker(code_dir: str) -> str:
+    """Run pytest in-process inside a pool worker, returning its output.
+
+    The worker keeps pytest (and its plugins) imported between runs, so
+    repeat validations skip the interpreter/import cold start a fresh
+    `python -m pytest` subprocess pays every time.
+    """
+    import io
+    from contextlib import redirect_stdout, redirect_stderr
+
+    import pytest
+
+    buf = io.StringIO()
+    with redirect_stdout(buf), redirect_stderr(buf):
+        pytest.main([
+            code_dir, "-v", "--tb=short",
+            "--import-mode=importlib", "-p", "no:cacheprovider",
+        ])
+    return buf.getvalue()
+
+
+def _mypy_worker(code_dir: str) -> bool:
+    """Run mypy's API in a pool worker; True when the check passes."""
+    try:
+        from mypy import api
+    except ImportError:
+        return True  # Skip type check if mypy unavailable
+    _, _, status = api.run([code_dir, "--ignore-missing-imports"])
+    return status == 0
+
 
 class ValidatorAgent:
     """
@@ -28,6 +148,35 @@ class ValidatorAgent:
     
     def __init__(self, llm: LegacyLensLLM = None):
         self.llm = llm
+        self._pool = None
+        # Private temp root: per-validation mkdtemp then only scans this
+        # (tiny) directory instead of a potentially huge shared /tmp
+        self._tmp_root = Path(tempfile.mkdtemp(prefix="legacylens-"))
+        atexit.register(shutil.rmtree, self._tmp_root, ignore_errors=True)
+    
+    def _get_pool(self):
+        """Lazily spawn the persistent worker pool (forkserver keeps
+        workers importable-state-clean but warm across validations)."""
+        if self._pool is None:
+            try:
+                ctx = multiprocessing.get_context("forkserver")
+                self._pool = ctx.Pool(processes=2)
+            except (OSError, ValueError):
+                self._pool = False  # Pool unavailable; use subprocess path
+        return self._pool or None
+
+    def _discard_pool(self) -> None:
+        """Terminate the pool; the next call respawns a fresh one.
+
+        apply_async().get(timeout=...) only abandons a hung worker — the
+        generated suite keeps running and pins its pool slot forever, so
+        two hung suites would turn every later validation into a
+        guaranteed timeout. Killing the whole pool matches the subprocess
+        path's proc.kill() watchdog.
+        """
+        pool, self._pool = self._pool, None
+        if pool:
+            pool.terminate()
     
     async def validate(
         self,
@@ -40,27 +189,31 @@ class ValidatorAgent:
         result = ValidationResult()
         
         # Create temp directory for code execution
-        with tempfile.TemporaryDirectory() as tmpdir:
+        with tempfile.TemporaryDirectory(dir=self._tmp_root) as tmpdir:
             tmppath = Path(tmpdir)
             
-            # Write Python modules
-            for name, code in generated_code.get("python_modules", {}).items():
-                (tmppath / name).write_text(code)
-            
-            # Write tests
-            for name, code in generated_code.get("python_tests", {}).items():
-                (tmppath / name).write_text(code)
+            # Write modules and tests concurrently with minimal
+            # per-file overhead
+            await asyncio.gather(
+                asyncio.to_thread(
+                    _bulk_write, tmppath, generated_code.get("python_modules", {})
+                ),
+                asyncio.to_thread(
+                    _bulk_write, tmppath, generated_code.get("python_tests", {})
+                ),
+            )
             
-            # Run pytest
-            test_result = self._run_pytest(tmppath)
+            # Tests and type checking are independent over the read-only
+            # staging dir; overlap them so wall clock tracks the slower one
+            test_result, result.type_check_passed = await asyncio.gather(
+                asyncio.to_thread(self._run_pytest, tmppath),
+                asyncio.to_thread(self._run_mypy, tmppath),
+            )
             result.tests_run = test_result["total"]
             result.tests_passed = test_result["passed"]
             result.tests_failed = test_result["failed"]
             result.failure_details = test_result["failures"]
             
-            # Run type checking
-            result.type_check_passed = self._run_mypy(tmppath)
-            
             # Determine status
             if result.tests_failed == 0 and result.type_check_passed:
                 result.status = ValidationStatus.PASSED
@@ -84,37 +237,19 @@ class ValidatorAgent:
     def _run_pytest(self, code_dir: Path) -> dict:
         """Run pytest and collect results."""
         try:
-            result = subprocess.run(
-                ["python", "-m", "pytest", str(code_dir), "-v", "--tb=short"],
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
-            
-            output = result.stdout + result.stderr
-            
-            # Parse pytest output
-            passed = output.count(" PASSED")
-            failed = output.count(" FAILED")
+            pool = self._get_pool()
+            if pool is not None:
+                try:
+                    output = pool.apply_async(
+                        _pytest_worker, (str(code_dir),)
+                    ).get(timeout=60)
+                except multiprocessing.TimeoutError:
+                    self._discard_pool()  # Worker is hung; kill it
+                    raise
+                return _parse_pytest_output(output)
+            return _run_pytest_subprocess(str(code_dir))
             
-            failures = []
-            if failed > 0:
-                # Extract failure details
-                for line in output.split("\n"):
-                    if "FAILED" in line or "AssertionError" in line:
-                        failures.append({
-                            "message": line.strip(),
-                            "category": "logic",
-                        })
-            
-            return {
-                "total": passed + failed,
-                "passed": passed,
-                "failed": failed,
-                "failures": failures,
-            }
-            
-        except subprocess.TimeoutExpired:
+        except (subprocess.TimeoutExpired, multiprocessing.TimeoutError):
             return {"total": 0, "passed": 0, "failed": 1, 
                     "failures": [{"message": "Test timeout", "category": "critical"}]}
         except Exception as e:
@@ -124,6 +259,15 @@ class ValidatorAgent:
     def _run_mypy(self, code_dir: Path) -> bool:
         """Run mypy type checking."""
         try:
+            pool = self._get_pool()
+            if pool is not None:
+                try:
+                    return pool.apply_async(
+                        _mypy_worker, (str(code_dir),)
+                    ).get(timeout=30)
+                except multiprocessing.TimeoutError:
+                    self._discard_pool()  # Worker is hung; kill it
+                    return True
             result = subprocess.run(
                 ["python", "-m", "mypy", str(code_dir), "--ignore-missing-imports"],
                 capture_output=True,
@@ -143,13 +287,17 @@ class ValidatorAgent:
         if not failures or not self.llm:
             return []
         
+        # Dedup repeated messages: retry loops often resurface the same
+        # assertion many times, and every duplicate line is prefill cost
+        unique = list({f["message"]: f for f in failures}.values())
+        
         prompt = f"""Analyze these test failures and suggest fixes:
 
 Failures:
-{failures}
+{unique}
 
 Generated Code:
-{list(generated_code.get('python_modules', {}).values())[:2]}
+{list(islice(generated_code.get('python_modules', {}).values(), 2))}
 
 For each failure, provide:
 1. Root cause
@@ -168,19 +316,8 @@ For each failure, provide:
             return "No failures to analyze"
         
         if self.llm:
-            prompt = f"Summarize the root cause of these failures: {failures}"
+            unique = list({f["message"] for f in failures})
+            prompt = f"Summarize the root cause of these failures: {unique}"
             return self.llm.generate(prompt, max_tokens=200)
         
         return f"Found {len(failures)} test failures requiring attention"
-    
-    def to_dict(self) -> dict:
-        """Serialize result for state storage."""
-        return {
-            "status": self.status.value,
-            "tests_run": self.tests_run,
-            "tests_passed": self.tests_passed,
-            "tests_failed": self.tests_failed,
-            "failure_details": self.failure_details,
-            "suggested_fixes": self.suggested_fixes,
-            "type_check_passed": self.type_check_passed,
-        }
@@ -8,9 +8,24 @@ Author: LegacyLens AI Architect
 """
 
 from __future__ import annotations
+from datetime import datetime
+from functools import lru_cache
 from typing import Literal, Callable, Any
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ..agents.archaeologist import ArchaeologistAgent
+from ..agents.architect import ArchitectAgent
+from ..agents.engineer import EngineerAgent
+from ..agents.scribe import ScribeAgent
+from ..agents.validator import ValidatorAgent
+from ..models.llm import get_model
 
 from .state import (
     AgentState,
@@ -24,6 +39,84 @@ from .state import (
 # CONDITIONAL EDGE LOGIC
 # =============================================================================
 
+# Integer codes for the scalar routing core. Plain int32-friendly values so
+# the core can be JIT-compiled (numba) without touching dicts or enums.
+_ROUTE_ENGINEER, _ROUTE_SCRIBE, _ROUTE_ERROR = 0, 1, 2
+_ROUTE_NAMES = ("engineer", "scribe", "error")
+_STATUS_CODES = {status: status.code for status in ValidationStatus}
+# Failure categories that do not block proceeding to documentation
+_MINOR_CATEGORIES = frozenset({"style", "deprecation", "warning", "optional"})
+# Raw-string variant skips Enum.__call__ on the hot conditional edge
+_STATUS_CODES_BY_VALUE = {status.value: code for status, code in _STATUS_CODES.items()}
+_STATUS_PENDING = _STATUS_CODES[ValidationStatus.PENDING]
+_STATUS_PASSED = _STATUS_CODES[ValidationStatus.PASSED]
+_STATUS_FAILED = _STATUS_CODES[ValidationStatus.FAILED]
+_STATUS_PARTIAL = _STATUS_CODES[ValidationStatus.PARTIAL]
+
+
+def _decide(
+    status_code: int,
+    pass_rate: float,
+    iteration: int,
+    max_retries: int,
+    has_fixes: bool,
+    failures_minor: bool,
+) -> int:
+    """
+    Scalar routing core for should_retry_or_proceed.
+
+    Operates purely on ints/floats (the dict is unpacked once by the
+    wrapper) so repeated decisions in long retry loops avoid per-branch
+    dict lookups and the whole function is numba-njit compatible.
+    """
+    # SUCCESS PATH: All tests pass and quality gates met
+    if status_code == _STATUS_PASSED:
+        return _ROUTE_SCRIBE
+
+    # PARTIAL SUCCESS: High pass rate, proceed with warnings
+    if status_code == _STATUS_PARTIAL and pass_rate >= 90.0:
+        return _ROUTE_SCRIBE
+
+    # RETRY PATH: Failures exist but we have retries and actionable fixes
+    if status_code == _STATUS_FAILED or status_code == _STATUS_PARTIAL:
+        if iteration < max_retries and has_fixes:
+            return _ROUTE_ENGINEER
+
+        # Check if failures are all minor (non-blocking)
+        if failures_minor:
+            return _ROUTE_SCRIBE
+
+    # FAILURE PATH: Exhausted retries or no actionable fixes
+    if iteration >= max_retries:
+        # Final attempt failed - check if we can proceed anyway
+        if pass_rate >= 70.0:
+            return _ROUTE_SCRIBE  # Proceed with known issues documented
+        return _ROUTE_ERROR
+
+    return _ROUTE_ERROR
+
+
+try:
+    # Optional: JIT the scalar core when numba is available. cache=True
+    # persists the compiled artifact so the cold compile is paid once.
+    from numba import njit
+    _decide = njit(cache=True)(_decide)
+except ImportError:
+    pass
+
+
+# Precomputed dispatch table for (status, has_retries, has_fixes) keys whose
+# route does not depend on pass rate or failure severity. The two most common
+# outcomes — all tests pass, or a fail with retries left and actionable
+# fixes — resolve in a single hash lookup; everything else falls through to
+# the full scalar core.
+_FAST_ROUTES: dict[tuple[int, bool, bool], str] = {
+    **{(_STATUS_PASSED, retries, fixes): "scribe"
+       for retries in (True, False) for fixes in (True, False)},
+    (_STATUS_FAILED, True, True): "engineer",
+}
+
+
 def should_retry_or_proceed(state: AgentState) -> Literal["engineer", "scribe", "error"]:
     """
     Critical conditional edge from Validator node.
@@ -54,36 +147,59 @@ def should_retry_or_proceed(state: AgentState) -> Literal["engineer", "scribe",
     if validation is None:
         return "error"
     
-    status = ValidationStatus(validation.get("status", "pending"))
-    pass_rate = _calculate_pass_rate(validation)
-    has_suggested_fixes = len(validation.get("suggested_fixes", [])) > 0
-    
-    # SUCCESS PATH: All tests pass and quality gates met
-    if status == ValidationStatus.PASSED:
-        return "scribe"
-    
-    # PARTIAL SUCCESS: High pass rate, proceed with warnings
-    if status == ValidationStatus.PARTIAL and pass_rate >= 90.0:
-        # Log warning but proceed
-        return "scribe"
-    
-    # RETRY PATH: Failures exist but we have retries and actionable fixes
-    if status in (ValidationStatus.FAILED, ValidationStatus.PARTIAL):
-        if iteration < max_retries and has_suggested_fixes:
-            return "engineer"
-        
-        # Check if failures are all minor (non-blocking)
-        if _are_failures_minor(validation):
-            return "scribe"
-    
-    # FAILURE PATH: Exhausted retries or no actionable fixes
-    if iteration >= max_retries:
-        # Final attempt failed - check if we can proceed anyway
-        if pass_rate >= 70.0:
-            return "scribe"  # Proceed with known issues documented
-        return "error"
-    
-    return "error"
+    # Unpack the dict exactly once, then decide on plain scalars; the
+    # value-keyed table avoids reconstructing the Enum member per edge
+    status_code = _STATUS_CODES_BY_VALUE.get(
+        validation.get("status", "pending"), _STATUS_PENDING
+    )
+    has_retries = iteration < max_retries
+    has_fixes = len(validation.get("suggested_fixes", [])) > 0
+
+    # Branchless fast path for pass-rate-independent routes
+    fast = _FAST_ROUTES.get((status_code, has_retries, has_fixes))
+    if fast is not None:
+        return fast
+
+    # Retry loops converge on identical snapshots; memoize the full
+    # decision on the scalar fields it actually reads
+    return _route_cached(
+        status_code,
+        validation.get("tests_run", 0),
+        validation.get("tests_passed", 0),
+        iteration,
+        max_retries,
+        has_fixes,
+        # Prefer the category column ValidationResult projects out at the
+        # produce site; re-derive it only for hand-built state dicts
+        tuple(
+            validation.get("failure_categories")
+            or (
+                f.get("category", "critical")
+                for f in validation.get("failure_details", [])
+            )
+        ),
+    )
+
+
+@lru_cache(maxsize=256)
+def _route_cached(
+    status_code: int,
+    tests_run: int,
+    tests_passed: int,
+    iteration: int,
+    max_retries: int,
+    has_fixes: bool,
+    failure_categories: tuple,
+) -> str:
+    """Memoized slow-path routing over a hashable validation snapshot."""
+    pass_rate = (tests_passed / tests_run) * 100 if tests_run else 0.0
+    failures_minor = all(
+        category in _MINOR_CATEGORIES for category in failure_categories
+    )
+    route = _decide(
+        status_code, pass_rate, iteration, max_retries, has_fixes, failures_minor
+    )
+    return _ROUTE_NAMES[route]
 
 
 def should_continue_after_error(state: AgentState) -> Literal["retry", "abort"]:
@@ -117,6 +233,36 @@ def should_continue_after_error(state: AgentState) -> Literal["retry", "abort"]:
     return "abort"
 
 
+def batch_pass_rates(tests_run, tests_passed):
+    """Vectorized pass rates for replaying many validation records.
+
+    Takes integer array-likes of test counts and returns percentages as
+    float64, with zero-run records mapping to 0.0. Uses the same numba
+    JIT escape hatch as the routing core when available.
+    """
+    import numpy as np
+
+    runs = np.asarray(tests_run, dtype=np.int64)
+    passed = np.asarray(tests_passed, dtype=np.int64)
+    return _batch_pass_rates_impl(runs, passed)
+
+
+def _batch_pass_rates_impl(runs, passed):
+    import numpy as np
+
+    out = np.empty(runs.size, dtype=np.float64)
+    for i in range(runs.size):
+        out[i] = 0.0 if runs[i] == 0 else passed[i] / runs[i] * 100.0
+    return out
+
+
+try:
+    from numba import njit as _njit
+    _batch_pass_rates_impl = _njit(cache=True, fastmath=True)(_batch_pass_rates_impl)
+except ImportError:
+    pass
+
+
 def _calculate_pass_rate(validation: dict) -> float:
     """Calculate the test pass percentage."""
     tests_run = validation.get("tests_run", 0)
@@ -143,20 +289,34 @@ def _are_failures_minor(validation: dict) -> bool:
     """
     failures = validation.get("failure_details", [])
     
-    minor_categories = {"style", "deprecation", "warning", "optional"}
-    
-    for failure in failures:
-        category = failure.get("category", "critical").lower()
-        if category not in minor_categories:
-            return False
-    
-    return True
+    # Categories are normalized to lowercase at the produce site
+    # (ValidationResult / the pytest parsers), so plain membership suffices
+    return all(
+        failure.get("category", "critical") in _MINOR_CATEGORIES
+        for failure in failures
+    )
 
 
 # =============================================================================
 # NODE IMPLEMENTATIONS (Stubs - Actual logic in agents/)
 # =============================================================================
 
+# Agents are stateless between calls apart from warm resources (memory
+# manager, validator worker pool), so one instance per class serves every
+# graph invocation. All share the process-global model.
+_AGENTS: dict[type, Any] = {}
+
+
+def _agent(cls):
+    """Return the shared agent instance, wiring in the model lazily."""
+    agent = _AGENTS.get(cls)
+    if agent is None:
+        agent = _AGENTS[cls] = cls(llm=get_model())
+    elif agent.llm is None:
+        # The model may have been initialized after the agent was built
+        agent.llm = get_model()
+    return agent
+
 async def archaeologist_node(state: AgentState) -> dict:
     """
     Node A: The Archaeologist
@@ -165,9 +325,8 @@ async def archaeologist_node(state: AgentState) -> dict:
     - Logic Schema (structured JSON)
     - Flow-based algorithm description
     """
-    from ..agents.archaeologist import ArchaeologistAgent
     
-    agent = ArchaeologistAgent()
+    agent = _agent(ArchaeologistAgent)
     result = await agent.analyze(
         source_code=state["legacy_source"],
         language=state["source_language"],
@@ -188,9 +347,8 @@ async def architect_node(state: AgentState) -> dict:
     
     Maps Logic Schema to modern Pythonic design patterns.
     """
-    from ..agents.architect import ArchitectAgent
     
-    agent = ArchitectAgent()
+    agent = _agent(ArchitectAgent)
     result = await agent.design(
         logic_schema=state["logic_schema"],
         target_python=state["target_python_version"],
@@ -211,9 +369,8 @@ async def engineer_node(state: AgentState) -> dict:
     Generates Python code and Next.js components.
     Incorporates feedback from previous validation attempts.
     """
-    from ..agents.engineer import EngineerAgent
     
-    agent = EngineerAgent()
+    agent = _agent(EngineerAgent)
     
     # Check if this is a retry iteration
     previous_failures = []
@@ -242,9 +399,8 @@ async def validator_node(state: AgentState) -> dict:
     Runs pytest suites and quality checks.
     Generates suggested fixes if tests fail.
     """
-    from ..agents.validator import ValidatorAgent
     
-    agent = ValidatorAgent()
+    agent = _agent(ValidatorAgent)
     result = await agent.validate(
         generated_code=state["generated_code"],
         logic_schema=state["logic_schema"],
@@ -264,10 +420,8 @@ async def scribe_node(state: AgentState) -> dict:
     
     Generates living documentation with Mermaid.js diagrams.
     """
-    from ..agents.scribe import ScribeAgent
-    from datetime import datetime
     
-    agent = ScribeAgent()
+    agent = _agent(ScribeAgent)
     result = await agent.document(
         logic_schema=state["logic_schema"],
         design_mapping=state["design_mapping"],
@@ -287,7 +441,6 @@ async def error_handler_node(state: AgentState) -> dict:
     """
     Error handler node for graceful degradation.
     """
-    from datetime import datetime
     
     return {
         "current_phase": RefactorPhase.COMPLETED,
@@ -390,20 +543,61 @@ def build_refactor_graph() -> StateGraph:
     return workflow
 
 
-def compile_graph(checkpointer: bool = True) -> Any:
+class _OrjsonCheckpointSerde(JsonPlusSerializer):
+    """Checkpoint serde that encodes JSON-safe state through orjson.
+
+    AgentState is nested builtins (plus str-valued enums, which orjson
+    emits by value), so the common case takes the C codec straight to
+    bytes; anything orjson cannot represent falls back to the stock
+    JsonPlusSerializer encoding under its own type tag.
+    """
+
+    # Datetimes and dataclasses must keep their types across a round
+    # trip, so force them through the fallback instead of letting orjson
+    # flatten them to strings/dicts
+    _OPTIONS = (
+        orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    ) if orjson is not None else 0
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        try:
+            return "orjson", orjson.dumps(obj, option=self._OPTIONS)
+        except TypeError:
+            return super().dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        if data[0] == "orjson":
+            return orjson.loads(data[1])
+        return super().loads_typed(data)
+
+
+@lru_cache(maxsize=2)
+def compile_graph(checkpointer: bool = False) -> Any:
     """
     Compile the graph with optional checkpointing.
-    
+
+    The topology is pure and deterministic given the node set, so the
+    compiled result is memoized (one entry per checkpointer flag): servers
+    pay the LangGraph compile once per process instead of once per job.
+
+    Checkpointing defaults to off: nothing in the codebase resumes from a
+    checkpoint, and MemorySaver deep-copies the full AgentState (including
+    multi-KB generated code and docs) on every node transition — and
+    retains it per thread_id for the life of the process.
+
     Args:
         checkpointer: Whether to enable state checkpointing
-        
+
     Returns:
         Compiled graph ready for invocation
     """
     workflow = build_refactor_graph()
     
     if checkpointer:
-        memory = MemorySaver()
+        serde = _OrjsonCheckpointSerde() if orjson is not None else None
+        memory = MemorySaver(serde=serde)
         return workflow.compile(checkpointer=memory)
     
     return workflow.compile()
@@ -439,12 +633,9 @@ async def run_refactor(
         **kwargs
     )
     
-    # Compile and run the graph
-    app = compile_graph(checkpointer=True)
-    
-    # Execute with thread ID for checkpointing
-    config = {"configurable": {"thread_id": source_file_path}}
+    # Compile and run the graph (no checkpointer: see compile_graph)
+    app = compile_graph()
     
-    final_state = await app.ainvoke(initial_state, config)
+    final_state = await app.ainvoke(initial_state)
     
     return final_state
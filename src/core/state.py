@@ -8,9 +8,16 @@ Author: LegacyLens AI Architect
 """
 
 from __future__ import annotations
+import time
+from datetime import datetime
 from typing import TypedDict, Literal, Optional, Annotated, Sequence
 from dataclasses import dataclass, field
 from enum import Enum
+
+try:
+    import msgspec  # C-coded serializer; falls back to field enumeration
+except ImportError:
+    msgspec = None
 from pydantic import BaseModel, Field
 import operator
 
@@ -33,7 +40,17 @@ class RefactorPhase(str, Enum):
     COMPLETED = "completed"
 
 
-@dataclass
+# Dense integer codes stamped onto the members (member.code) so hot
+# comparisons and array indexing work on plain ints while the string
+# values remain the serialization format
+for _code, _member in enumerate(ValidationStatus):
+    _member.code = _code
+for _code, _member in enumerate(RefactorPhase):
+    _member.code = _code
+del _code, _member
+
+
+@dataclass(slots=True)
 class LogicSchema:
     """
     Structured representation of parsed legacy code logic.
@@ -67,25 +84,10 @@ class LogicSchema:
     
     def to_dict(self) -> dict:
         """Serialize to dictionary for JSON storage."""
-        return {
-            "source_file": self.source_file,
-            "language": self.language,
-            "classes": self.classes,
-            "functions": self.functions,
-            "global_variables": self.global_variables,
-            "memory_allocations": self.memory_allocations,
-            "pointer_operations": self.pointer_operations,
-            "resource_handles": self.resource_handles,
-            "control_flow_graph": self.control_flow_graph,
-            "call_graph": self.call_graph,
-            "includes": self.includes,
-            "external_dependencies": self.external_dependencies,
-            "cyclomatic_complexity": self.cyclomatic_complexity,
-            "lines_of_code": self.lines_of_code,
-        }
-
-
-@dataclass
+        return _serialize(self)
+
+
+@dataclass(slots=True)
 class DesignMapping:
     """
     Mapping from legacy patterns to modern Pythonic designs.
@@ -109,9 +111,13 @@ class DesignMapping:
     # Architecture decisions
     design_rationale: str = ""
     risk_assessment: list[dict] = field(default_factory=list)
+    
+    def to_dict(self) -> dict:
+        """Serialize to dictionary for JSON storage."""
+        return _serialize(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedCode:
     """
     Container for generated modern code artifacts.
@@ -133,9 +139,13 @@ class GeneratedCode:
     # Iteration tracking
     iteration: int = 1
     previous_failures: list[dict] = field(default_factory=list)
+    
+    def to_dict(self) -> dict:
+        """Serialize to dictionary for JSON storage."""
+        return _serialize(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """
     Comprehensive validation results from pytest execution.
@@ -165,6 +175,23 @@ class ValidationResult:
     # Reflection data for retry
     suggested_fixes: list[dict] = field(default_factory=list)
     root_cause_analysis: str = ""
+
+    # Columnar projection of failure_details["category"], built once at
+    # the produce site so routing scans a flat tuple instead of pulling
+    # the key out of every dict per decision
+    failure_categories: tuple[str, ...] = ()
+
+    def __post_init__(self):
+        # Normalize categories at the produce site so routing checks can
+        # use plain membership tests without per-check lower() copies
+        for failure in self.failure_details:
+            category = failure.get("category")
+            if category is not None:
+                failure["category"] = category.lower()
+        self.failure_categories = tuple(
+            failure.get("category", "critical")
+            for failure in self.failure_details
+        )
     
     @property
     def should_retry(self) -> bool:
@@ -180,9 +207,13 @@ class ValidationResult:
         if self.tests_run == 0:
             return 0.0
         return (self.tests_passed / self.tests_run) * 100
+    
+    def to_dict(self) -> dict:
+        """Serialize to dictionary for JSON storage."""
+        return _serialize(self)
 
 
-@dataclass 
+@dataclass(slots=True)
 class Documentation:
     """
     Living documentation artifacts.
@@ -205,6 +236,26 @@ class Documentation:
     
     # Changelog
     changelog_entry: str = ""
+    
+    def to_dict(self) -> dict:
+        """Serialize to dictionary for JSON storage."""
+        return _serialize(self)
+
+
+def _serialize(obj) -> dict:
+    """Dump a state dataclass to JSON-ready builtins.
+
+    msgspec walks the fields in C (no per-field Python attribute loads);
+    the fallback enumerates dataclass fields by hand and unwraps enums
+    the way the old hand-written to_dict did.
+    """
+    if msgspec is not None:
+        return msgspec.to_builtins(obj)
+    return {
+        name: value.value if isinstance(value, Enum) else value
+        for name in obj.__dataclass_fields__
+        for value in (getattr(obj, name),)
+    }
 
 
 def merge_messages(left: list[dict], right: list[dict]) -> list[dict]:
@@ -285,11 +336,49 @@ class AgentState(TypedDict):
     error_node: Optional[str]
     
     # ===== METADATA =====
-    started_at: str  # ISO timestamp
+    started_at: str  # ISO timestamp, for humans
+    started_at_ns: int  # monotonic clock, for duration math and ordering
     completed_at: Optional[str]
     total_tokens_used: int
 
 
+# Per-call fields are overwritten in create_initial_state; everything
+# else is constant, so each job starts from one shallow copy of this
+# template instead of rebuilding the full dict literal
+_INITIAL_STATE_TEMPLATE: AgentState = AgentState(
+    # Input (overwritten per job)
+    legacy_source="",
+    source_file_path="",
+    source_language="cpp",
+    target_python_version="3.11",
+    target_nextjs_version="14",
+
+    # Processing
+    current_phase=RefactorPhase.ARCHAEOLOGY,
+    messages=[],
+    iteration_count=1,
+    max_retries=3,
+
+    # Outputs (initially None)
+    logic_schema=None,
+    flow_description=None,
+    design_mapping=None,
+    generated_code=None,
+    validation_result=None,
+    documentation=None,
+
+    # Error handling
+    error=None,
+    error_node=None,
+
+    # Metadata
+    started_at="",
+    started_at_ns=0,
+    completed_at=None,
+    total_tokens_used=0,
+)
+
+
 def create_initial_state(
     legacy_source: str,
     source_file_path: str,
@@ -300,7 +389,7 @@ def create_initial_state(
 ) -> AgentState:
     """
     Factory function to create the initial state for a refactoring job.
-    
+
     Args:
         legacy_source: The raw legacy C++/Java source code
         source_file_path: Path to the source file
@@ -308,40 +397,21 @@ def create_initial_state(
         target_python_version: Target Python version
         target_nextjs_version: Target Next.js version
         max_retries: Maximum validation retry attempts
-        
+
     Returns:
         Initialized AgentState ready for the workflow
     """
-    from datetime import datetime
-    
-    return AgentState(
-        # Input
+    state = _INITIAL_STATE_TEMPLATE.copy()
+    state.update(
         legacy_source=legacy_source,
         source_file_path=source_file_path,
         source_language=source_language,
         target_python_version=target_python_version,
         target_nextjs_version=target_nextjs_version,
-        
-        # Processing
-        current_phase=RefactorPhase.ARCHAEOLOGY,
-        messages=[],
-        iteration_count=1,
         max_retries=max_retries,
-        
-        # Outputs (initially None)
-        logic_schema=None,
-        flow_description=None,
-        design_mapping=None,
-        generated_code=None,
-        validation_result=None,
-        documentation=None,
-        
-        # Error handling
-        error=None,
-        error_node=None,
-        
-        # Metadata
+        messages=[],  # Fresh list: the reducer appends in place
         started_at=datetime.now().isoformat(),
-        completed_at=None,
-        total_tokens_used=0,
+        # Monotonic, so elapsed-time math is immune to wall-clock jumps
+        started_at_ns=time.monotonic_ns(),
     )
+    return state
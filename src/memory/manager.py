@@ -15,15 +15,128 @@ Author: LegacyLens AI Architect
 from __future__ import annotations
 from typing import Optional, Literal
 from dataclasses import dataclass, field
+from functools import lru_cache
+from collections import OrderedDict
 from pathlib import Path
+import asyncio
+import hashlib
 import logging
+import os
+import re
+import tempfile
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Content-addressed summary cache: chunk summaries depend only on the
+# chunk text, so incremental runs over a codebase re-pay the LLM only
+# for the chunks that actually changed
+_SUMMARY_CACHE_DIR = Path(
+    os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+) / "legacylens" / "summaries"
+
+
+def _content_key(kind: str, text: str) -> str:
+    """Hash (kind, text) into a stable cache key."""
+    blob = f"{kind}|{text}".encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def _summary_cache_get(key: str) -> Optional[str]:
+    """Read a cached summary; None on miss."""
+    try:
+        return (_SUMMARY_CACHE_DIR / key).read_text()
+    except OSError:
+        return None
+
+
+def _summary_cache_put(key: str, summary: str) -> None:
+    """Persist a summary atomically; failures are non-fatal."""
+    try:
+        _SUMMARY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=_SUMMARY_CACHE_DIR)
+        with os.fdopen(fd, "w") as f:
+            f.write(summary)
+        os.replace(tmp_name, _SUMMARY_CACHE_DIR / key)
+    except OSError:
+        pass
+
+try:
+    # Optional: real grammars beat the brace-counting fallback, which is
+    # both interpreted-Python slow and fooled by braces in strings/comments
+    from tree_sitter import Language, Parser
+    import tree_sitter_cpp
+    import tree_sitter_java
+
+    _TS_LANGUAGES = {
+        "cpp": Language(tree_sitter_cpp.language()),
+        "java": Language(tree_sitter_java.language()),
+    }
+except ImportError:
+    _TS_LANGUAGES = None
+
+# tree-sitter node types -> ChunkMetadata.chunk_type
+_TS_CHUNK_TYPES = {
+    "class_specifier": "class",
+    "struct_specifier": "class",
+    "class_declaration": "class",
+    "function_definition": "function",
+    "method_declaration": "method",
+    "preproc_include": "import",
+    "import_declaration": "import",
+}
+
 
-@dataclass
+class SourceView:
+    """Line-indexed view over a source string, encoded exactly once.
+
+    Splitting the source on every chunk lookup costs an O(N) list
+    allocation per call; indexing the newline offsets once turns each
+    lookup into a pure slice of the original string. The UTF-8 bytes and
+    their uint8 aliasing are kept too, so brace scanning and tree-sitter
+    parsing share one encode instead of each re-encoding the file.
+    """
+
+    __slots__ = ("source", "data", "buffer", "newline_positions", "_offsets")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.data = source.encode()
+        self.buffer = np.frombuffer(self.data, dtype=np.uint8)
+        self.newline_positions = np.flatnonzero(self.buffer == 0x0A)
+        if len(self.data) == len(source):
+            # Pure ASCII: byte positions are character positions, so the
+            # line offsets come straight from the vectorized scan
+            offsets = [0]
+            offsets.extend((self.newline_positions + 1).tolist())
+            offsets.append(len(source) + 1)  # Sentinel past the last line
+        else:
+            offsets = [0]
+            offsets.extend(i + 1 for i, c in enumerate(source) if c == '\n')
+            offsets.append(len(source) + 1)
+        self._offsets = offsets
+
+    @property
+    def line_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def line_slice(self, start_line: int, end_line: int) -> str:
+        """Return lines start_line..end_line (1-based, inclusive)."""
+        last = len(self._offsets) - 1
+        end = min(end_line, last)
+        if start_line > end:
+            return ""
+        return self.source[self._offsets[start_line - 1]:self._offsets[end] - 1]
+
+
+@dataclass(slots=True)
 class ChunkMetadata:
-    """Metadata for a code chunk."""
+    """Metadata for a code chunk.
+
+    Slotted: the RAG index holds thousands of these per repository, and
+    dropping the per-instance __dict__ roughly halves their footprint.
+    """
     chunk_id: str
     file_path: str
     start_line: int
@@ -31,17 +144,23 @@ class ChunkMetadata:
     chunk_type: Literal["class", "function", "block", "import", "other"]
     parent_scope: Optional[str] = None
     token_count: int = 0
-    embedding: Optional[list[float]] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MemoryConfig:
-    """Configuration for memory-efficient processing."""
+    """Configuration for memory-efficient processing.
+
+    Frozen and slotted: instances are shared across the chunker, RAG
+    retriever and window processor, slots make every access in those
+    hot paths a direct load, and immutability means derived values can
+    be computed once and trusted (and configs can key caches).
+    """
     # Context window limits
     max_context_tokens: int = 8192
     reserved_output_tokens: int = 2048
-    available_input_tokens: int = 6144  # max - reserved
-    
+    # Derived (max - reserved) when not given explicitly
+    available_input_tokens: Optional[int] = None
+
     # Chunking parameters
     chunk_size_tokens: int = 512
     chunk_overlap_tokens: int = 64
@@ -56,6 +175,14 @@ class MemoryConfig:
     enable_hierarchical_summary: bool = True
     summary_max_tokens: int = 256
 
+    def __post_init__(self):
+        if self.available_input_tokens is None:
+            # frozen: assignment must go through object.__setattr__
+            object.__setattr__(
+                self, "available_input_tokens",
+                self.max_context_tokens - self.reserved_output_tokens,
+            )
+
 
 class CodeChunker:
     """
@@ -67,56 +194,102 @@ class CodeChunker:
     - Control flow blocks
     """
     
+    # Compiled once: chunk-kind markers, tried leftmost-first per chunk
+    # Group names double as the returned chunk type, so detection is
+    # one scan plus a lastgroup read with no dispatch chain
+    _TYPE_RE = re.compile(
+        r"(?P<class>\b(?:class|struct)\s)"
+        r"|(?P<import>#include|\bimport\s)"
+        r"|(?P<function>\(.*?\).*?\{)",
+        re.DOTALL,
+    )
+
     def __init__(self, config: MemoryConfig, llm):
         self.config = config
         self.llm = llm
-    
-    def chunk_file(self, source_code: str, language: str) -> list[ChunkMetadata]:
+        self._parsers = {}
+
+    def _get_parser(self, language: str):
+        """Build (and keep) one tree-sitter parser per language."""
+        if _TS_LANGUAGES is None or language not in _TS_LANGUAGES:
+            return None
+        parser = self._parsers.get(language)
+        if parser is None:
+            parser = self._parsers[language] = Parser(_TS_LANGUAGES[language])
+        return parser
+    
+    def chunk_file(self, source_code: str | SourceView, language: str) -> list[ChunkMetadata]:
         """
         Chunk source code into semantically meaningful pieces.
-        
+
         Strategy:
         1. Parse AST to identify natural boundaries
         2. Group small constructs, split large ones
         3. Maintain overlap for context continuity
         """
-        chunks = []
-        
-        if language == "cpp":
-            chunks = self._chunk_cpp(source_code)
-        elif language == "java":
-            chunks = self._chunk_java(source_code)
-        else:
-            chunks = self._chunk_generic(source_code)
+        # One view per file: the encode, newline scan and line index are
+        # shared by boundary detection, text extraction and token counts.
+        # Callers that already hold a view pass it straight through.
+        view = (
+            source_code if isinstance(source_code, SourceView)
+            else SourceView(source_code)
+        )
+
+        chunker = self._LANG_CHUNKERS.get(language, CodeChunker._chunk_generic)
+        chunks = chunker(self, view)
+
+        # Counts come from the content-addressed LRU; only chunks whose
+        # text changed since the last run reach the tokenizer, batched
+        # when the LLM supports it. Each count is stored once on the
+        # chunk and reused downstream instead of re-tokenizing.
+        texts = [self._get_chunk_text(view, chunk) for chunk in chunks]
+        for chunk, count in zip(chunks, _chunk_token_counts(self.llm, texts)):
+            chunk.token_count = count
+
+        return chunks
+
+    def _chunk_tree_sitter(self, view: SourceView, language: str) -> list[ChunkMetadata]:
+        """Chunk via a real parse: one C-level walk, string/comment aware."""
+        parser = self._get_parser(language)
+        tree = parser.parse(view.data)
         
-        # Calculate token counts
-        for chunk in chunks:
-            chunk.token_count = self.llm.count_tokens(
-                self._get_chunk_text(source_code, chunk)
-            )
+        chunks = []
+        for node in tree.root_node.children:
+            chunk_type = _TS_CHUNK_TYPES.get(node.type, "other")
+            if node.start_point[0] == node.end_point[0] and chunk_type == "other":
+                continue  # Skip stray one-line tokens (comments, semicolons)
+            chunks.append(ChunkMetadata(
+                chunk_id=f"chunk_{len(chunks)}",
+                file_path="",
+                start_line=node.start_point[0] + 1,
+                end_line=node.end_point[0] + 1,
+                chunk_type=chunk_type if chunk_type != "method" else "function",
+            ))
         
         return chunks
     
-    def _chunk_cpp(self, source: str) -> list[ChunkMetadata]:
-        """Parse C++ using regex patterns (full AST would use libclang)."""
-        import re
+    def _chunk_cpp(self, view: SourceView) -> list[ChunkMetadata]:
+        """Parse C++ using tree-sitter, or regex patterns as fallback."""
+        if self._get_parser("cpp") is not None:
+            return self._chunk_tree_sitter(view, "cpp")
+        buf = view.buffer
+        if buf.size == 0:
+            return []
+
+        # Brace depth for the whole file in three vectorized passes;
+        # braces and newlines are single bytes even in UTF-8, so byte
+        # positions line up with line boundaries
+        delta = (buf == 0x7B).astype(np.int8)  # '{'
+        delta -= buf == 0x7D                   # '}'
+        depth = np.cumsum(delta, dtype=np.int32)
+        line_depth = np.append(depth[view.newline_positions], depth[-1])
+
+        # Only the (few) lines that close back to depth 0 need Python
         chunks = []
-        lines = source.split('\n')
-        
-        # Pattern for class/struct definitions
-        class_pattern = re.compile(r'^(class|struct)\s+(\w+)')
-        func_pattern = re.compile(r'^[\w\s\*&]+\s+(\w+)\s*\([^)]*\)\s*{?')
-        
         current_chunk_start = 0
-        brace_depth = 0
-        
-        for i, line in enumerate(lines):
-            # Track brace depth for scope detection
-            brace_depth += line.count('{') - line.count('}')
-            
-            # Detect chunk boundaries at depth 0
-            if brace_depth == 0 and i > current_chunk_start:
-                chunk_text = '\n'.join(lines[current_chunk_start:i+1])
+        for i in np.flatnonzero(line_depth == 0).tolist():
+            if i > current_chunk_start:
+                chunk_text = view.line_slice(current_chunk_start + 1, i + 1)
                 if chunk_text.strip():
                     chunk_type = self._detect_chunk_type(chunk_text)
                     chunks.append(ChunkMetadata(
@@ -127,23 +300,25 @@ class CodeChunker:
                         chunk_type=chunk_type,
                     ))
                 current_chunk_start = i + 1
-        
+
         return chunks
     
-    def _chunk_java(self, source: str) -> list[ChunkMetadata]:
-        """Parse Java using regex patterns."""
-        return self._chunk_cpp(source)  # Similar brace-based structure
-    
-    def _chunk_generic(self, source: str) -> list[ChunkMetadata]:
+    def _chunk_java(self, view: SourceView) -> list[ChunkMetadata]:
+        """Parse Java with its own grammar when available."""
+        if self._get_parser("java") is not None:
+            return self._chunk_tree_sitter(view, "java")
+        return self._chunk_cpp(view)  # Similar brace-based structure
+
+    def _chunk_generic(self, view: SourceView) -> list[ChunkMetadata]:
         """Fallback: chunk by line count with overlap."""
-        lines = source.split('\n')
+        n_lines = view.line_count
         chunks = []
-        
+
         lines_per_chunk = 50
         overlap = 5
-        
-        for i in range(0, len(lines), lines_per_chunk - overlap):
-            end = min(i + lines_per_chunk, len(lines))
+
+        for i in range(0, n_lines, lines_per_chunk - overlap):
+            end = min(i + lines_per_chunk, n_lines)
             chunks.append(ChunkMetadata(
                 chunk_id=f"chunk_{len(chunks)}",
                 file_path="",
@@ -155,19 +330,131 @@ class CodeChunker:
         return chunks
     
     def _detect_chunk_type(self, text: str) -> str:
-        """Detect the type of code chunk."""
-        if 'class ' in text or 'struct ' in text:
-            return "class"
-        elif '(' in text and ')' in text and '{' in text:
-            return "function"
-        elif '#include' in text or 'import ' in text:
-            return "import"
-        return "other"
+        """Detect the type of code chunk (one pass over the text)."""
+        match = self._TYPE_RE.search(text)
+        return match.lastgroup if match is not None else "other"
     
-    def _get_chunk_text(self, source: str, chunk: ChunkMetadata) -> str:
-        """Extract chunk text from source."""
-        lines = source.split('\n')
-        return '\n'.join(lines[chunk.start_line-1:chunk.end_line])
+    def _get_chunk_text(self, view: SourceView, chunk: ChunkMetadata) -> str:
+        """Extract chunk text from an indexed source view."""
+        return view.line_slice(chunk.start_line, chunk.end_line)
+
+    # Language -> chunking strategy; unknown languages fall back to the
+    # generic line chunker. New languages register here instead of
+    # growing an if/elif chain in chunk_file. C shares the C++ grammar.
+    _LANG_CHUNKERS = {
+        "cpp": _chunk_cpp,
+        "c": _chunk_cpp,
+        "java": _chunk_java,
+    }
+
+
+@lru_cache(maxsize=32)
+def _cached_token_count(llm, source: str) -> int:
+    """Memoize full-file token counts; retries re-analyze the same file."""
+    return llm.count_tokens(source)
+
+
+def _quantize_rows(matrix: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+    """Symmetric per-row int8 quantization.
+
+    Returns the int8 matrix and float16 per-row scales such that
+    row ~= q_row * scale. All-zero rows get scale 1 to avoid 0/0.
+    """
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float16)
+
+
+_NEWLINE_RE = re.compile(r"\n")
+
+
+def _window_ranges(n_chars: int, newline_positions: "np.ndarray",
+                   window_chars: int, overlap_chars: int) -> list[tuple[int, int]]:
+    """(start, end) pairs for overlapping windows, snapped to newlines.
+
+    Pure integer kernel: the newline positions are gathered once by the
+    caller, so each snap is a binary search over that array instead of
+    a backwards character scan through the window. The loop itself
+    stays sequential because every start depends on the previous
+    (snapped) end.
+    """
+    ranges = []
+    start = 0
+    while start < n_chars:
+        end = min(start + window_chars, n_chars)
+        if end < n_chars and newline_positions.size:
+            # side="left" - 1: last newline strictly before end, matching
+            # the half-open [start, end) the old rfind scanned
+            idx = int(np.searchsorted(newline_positions, end, side="left")) - 1
+            if idx >= 0:
+                newline_pos = int(newline_positions[idx])
+                if newline_pos > start:
+                    end = newline_pos + 1
+        ranges.append((start, end))
+        if end == n_chars:
+            break  # Overlap would step back past EOF and loop forever
+        start = end - overlap_chars
+    return ranges
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _token_hashes(text: str) -> "np.ndarray":
+    """Unique hashes of the lowercased words in text.
+
+    Backs the no-embeddings retrieval fallback; hashes are folded into
+    2^18 buckets so the arrays stay small-int and cache-friendly.
+    """
+    words = {word.lower() for word in _WORD_RE.findall(text)}
+    return np.unique(np.fromiter(
+        (hash(word) & 0x3FFFF for word in words), dtype=np.int64, count=len(words)
+    ))
+
+
+# Content-addressed chunk token counts: chunk boundaries shift between
+# runs but most chunk text is identical, so re-analysis pays the
+# tokenizer only for chunks that actually changed
+_TOKEN_COUNT_CACHE: OrderedDict[str, int] = OrderedDict()
+_TOKEN_COUNT_CAPACITY = 4096
+
+
+def _chunk_token_counts(llm, texts: list[str]) -> list[int]:
+    """Token counts for chunk texts through the content-addressed LRU.
+
+    Hits are dict probes; only the misses go to the tokenizer, batched
+    when the LLM supports it.
+    """
+    keys = [_content_key("tokens", text) for text in texts]
+    counts: list = [None] * len(texts)
+    missing = []
+    for i, key in enumerate(keys):
+        cached = _TOKEN_COUNT_CACHE.get(key)
+        if cached is not None:
+            _TOKEN_COUNT_CACHE.move_to_end(key)
+            counts[i] = cached
+        else:
+            missing.append(i)
+    if missing:
+        batch = getattr(llm, "count_tokens_batch", None)
+        if batch is not None:
+            fresh = batch([texts[i] for i in missing])
+        else:
+            fresh = [llm.count_tokens(texts[i]) for i in missing]
+        for i, count in zip(missing, fresh):
+            counts[i] = count
+            _TOKEN_COUNT_CACHE[keys[i]] = count
+        while len(_TOKEN_COUNT_CACHE) > _TOKEN_COUNT_CAPACITY:
+            _TOKEN_COUNT_CACHE.popitem(last=False)
+    return counts
+
+
+@lru_cache(maxsize=2)
+def _embedding_model(name: str):
+    """Load the SentenceTransformer once per process (it is expensive)."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
 
 
 class RAGCodeRetriever:
@@ -183,60 +470,176 @@ class RAGCodeRetriever:
     def __init__(self, config: MemoryConfig):
         self.config = config
         self.chunks: list[ChunkMetadata] = []
-        self.embeddings_cache: dict[str, list[float]] = {}
-    
-    def index_codebase(self, chunks: list[ChunkMetadata], source_code: str):
+        # LRU of content hash -> float32 vector, shared by chunk texts
+        # and queries (identical strings embed identically)
+        self.embeddings_cache: OrderedDict[str, "np.ndarray"] = OrderedDict()
+        # Structure-of-arrays embedding store: rows live here, parallel
+        # to self.chunks, never on the metadata objects themselves
+        self._emb_rows: list["np.ndarray"] = []
+        self._emb_matrix = None  # (K, D) int8, rows quantized per-row
+        self._emb_scales = None  # (K,) float16 dequantization scales
+        # Keyword-hash index for the no-embeddings fallback: one flat
+        # array of token hashes plus the chunk index each came from
+        self._fallback_tokens: Optional["np.ndarray"] = None
+        self._fallback_ids: Optional["np.ndarray"] = None
+        # Result LRU: repeated queries skip the whole scoring pass. The
+        # version stamp invalidates entries whenever the index mutates.
+        self._result_cache: OrderedDict[tuple, list[ChunkMetadata]] = OrderedDict()
+        self._index_version = 0
+
+    _RESULT_CACHE_CAPACITY = 512
+
+    _CACHE_CAPACITY = 4096
+
+    def _remember_embedding(self, key: str, embedding) -> None:
+        """Insert into the LRU, evicting the stalest entry when full."""
+        self.embeddings_cache[key] = embedding
+        self.embeddings_cache.move_to_end(key)
+        while len(self.embeddings_cache) > self._CACHE_CAPACITY:
+            self.embeddings_cache.popitem(last=False)
+    
+    def index_codebase(self, chunks: list[ChunkMetadata], source_code: str | SourceView):
         """Build embedding index for code chunks."""
         try:
-            from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer(self.config.embedding_model)
-            
-            for chunk in chunks:
-                text = self._get_chunk_text(source_code, chunk)
-                embedding = model.encode(text).tolist()
-                chunk.embedding = embedding
-                self.chunks.append(chunk)
-                
+            model = _embedding_model(self.config.embedding_model)
         except ImportError:
             logger.warning("sentence-transformers not installed, using fallback")
-            self._index_fallback(chunks)
-    
-    def _index_fallback(self, chunks: list[ChunkMetadata]):
-        """Fallback indexing without embeddings."""
+            view = (
+                source_code if isinstance(source_code, SourceView)
+                else SourceView(source_code)
+            )
+            self._index_fallback(
+                chunks, [self._get_chunk_text(view, c) for c in chunks]
+            )
+            return
+        
+        # One batched encode of the chunks not already in the content-
+        # keyed cache: the model pads and tensorizes internally,
+        # collapsing N forward passes into N/batch_size
+        view = (
+            source_code if isinstance(source_code, SourceView)
+            else SourceView(source_code)
+        )
+        texts = [self._get_chunk_text(view, c) for c in chunks]
+        keys = [_content_key("embed", text) for text in texts]
+        embeddings = [self.embeddings_cache.get(key) for key in keys]
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            fresh = model.encode(
+                [texts[i] for i in misses],
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            for i, embedding in zip(misses, fresh):
+                embeddings[i] = embedding
+                self._remember_embedding(keys[i], embedding)
+        self._emb_rows.extend(embeddings)  # parallel to self.chunks
+        self.chunks.extend(chunks)
+
+        # Stack once, then quantize to int8 with a per-row scale: 4x
+        # less bandwidth for the GEMV that dominates retrieve, at a
+        # cosine error well under the similarity threshold's resolution
+        stacked = np.asarray(self._emb_rows, dtype=np.float32)
+        self._emb_matrix, self._emb_scales = _quantize_rows(stacked)
+        self._index_version += 1  # stale retrieve results must not serve
+    
+    def _index_fallback(self, chunks: list[ChunkMetadata],
+                        texts: Optional[list[str]] = None):
+        """Keyword-hash indexing when no embedding model is installed.
+
+        Token hashes for all chunks live in one flat array alongside a
+        parallel chunk-index array, so query scoring is two NumPy ops
+        (isin + bincount) instead of a Python loop over chunks.
+        """
         self.chunks = chunks
+        self._index_version += 1  # stale retrieve results must not serve
+        if not texts:
+            return
+        hashes = [_token_hashes(text) for text in texts]
+        if hashes:
+            self._fallback_tokens = np.concatenate(hashes)
+            self._fallback_ids = np.repeat(
+                np.arange(len(hashes)), [h.size for h in hashes]
+            )
     
     def retrieve(self, query: str, top_k: Optional[int] = None) -> list[ChunkMetadata]:
         """Retrieve most relevant chunks for a query."""
         k = top_k or self.config.top_k_retrieval
-        
-        if not self.chunks[0].embedding:
-            return self.chunks[:k]  # Fallback: return first k
-        
+
+        cache_key = (_content_key("retrieve", query), self._index_version, k)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            self._result_cache.move_to_end(cache_key)
+            return list(cached)
+
+        results = self._retrieve_uncached(query, k)
+        self._result_cache[cache_key] = results
+        while len(self._result_cache) > self._RESULT_CACHE_CAPACITY:
+            self._result_cache.popitem(last=False)
+        return list(results)
+
+    def _retrieve_uncached(self, query: str, k: int) -> list[ChunkMetadata]:
+        if self._emb_matrix is None:
+            return self._retrieve_fallback(query, k)
+
         try:
-            from sentence_transformers import SentenceTransformer
-            import numpy as np
-            
-            model = SentenceTransformer(self.config.embedding_model)
-            query_embedding = model.encode(query)
-            
-            # Cosine similarity
-            similarities = []
-            for chunk in self.chunks:
-                sim = np.dot(query_embedding, chunk.embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(chunk.embedding)
-                )
-                similarities.append((chunk, sim))
-            
-            # Sort by similarity
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            return [c for c, s in similarities[:k] if s >= self.config.similarity_threshold]
+            # Retries re-ask near-identical questions; exact repeats hit
+            # the embedding LRU instead of another encoder forward pass
+            key = _content_key("embed", query)
+            query_embedding = self.embeddings_cache.get(key)
+            if query_embedding is None:
+                model = _embedding_model(self.config.embedding_model)
+                query_embedding = model.encode(
+                    query, normalize_embeddings=True
+                ).astype(np.float32)
+                self._remember_embedding(key, query_embedding)
+            else:
+                self.embeddings_cache.move_to_end(key)
+
+            # One quantized matrix-vector product yields every cosine
+            # similarity at once; the per-row and query scales undo the
+            # int8 mapping after the integer accumulate
+            q_query, q_scale = _quantize_rows(query_embedding[None, :])
+            sims = (
+                (self._emb_matrix @ q_query[0].astype(np.int32))
+                * (self._emb_scales.astype(np.float32) * float(q_scale[0]))
+            )
+
+            if k < sims.size:
+                top = np.argpartition(-sims, k)[:k]
+            else:
+                top = np.arange(sims.size)
+            top = top[np.argsort(-sims[top])]
+            return [
+                self.chunks[i] for i in top
+                if sims[i] >= self.config.similarity_threshold
+            ]
             
         except ImportError:
             return self.chunks[:k]
-    
-    def _get_chunk_text(self, source: str, chunk: ChunkMetadata) -> str:
-        lines = source.split('\n')
-        return '\n'.join(lines[chunk.start_line-1:chunk.end_line])
+
+    def _retrieve_fallback(self, query: str, k: int) -> list[ChunkMetadata]:
+        """Rank by keyword-hash overlap; first-k when nothing is indexed."""
+        if self._fallback_tokens is None or not self.chunks:
+            return self.chunks[:k]
+        query_hashes = _token_hashes(query)
+        if query_hashes.size == 0:
+            return self.chunks[:k]
+        overlap = np.isin(self._fallback_tokens, query_hashes)
+        scores = np.bincount(
+            self._fallback_ids[overlap], minlength=len(self.chunks)
+        )
+        if k < scores.size:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(scores.size)
+        top = top[np.argsort(-scores[top])]
+        return [self.chunks[i] for i in top]
+
+    def _get_chunk_text(self, view: SourceView, chunk: ChunkMetadata) -> str:
+        return view.line_slice(chunk.start_line, chunk.end_line)
 
 
 class SlidingWindowProcessor:
@@ -280,11 +683,58 @@ class SlidingWindowProcessor:
         
         return results
     
+    async def process_large_file_async(self, source_code: str, process_fn) -> list:
+        """Process windows as a two-slot pipeline.
+
+        The strictly sequential loop leaves the LLM idle while each
+        summary is folded into the next context. Here window i+1 is
+        dispatched as soon as its text is ready, using the most recent
+        summary that has completed — one window behind the sequential
+        version — so the next call overlaps with summarizing the
+        previous result instead of waiting on it.
+
+        Args:
+            source_code: The full source code
+            process_fn: Sync or async callable invoked per window
+
+        Returns:
+            List of results from each window, in window order
+        """
+        windows = self._create_windows(source_code)
+        if not windows:
+            return []
+
+        is_async = asyncio.iscoroutinefunction(process_fn)
+        results: list = [None] * len(windows)
+        previous_summary = ""
+        pending = None
+
+        for i, (window_text, metadata) in enumerate(windows):
+            context = f"Previous context: {previous_summary}\n\n{window_text}"
+            if is_async:
+                task = asyncio.create_task(process_fn(context, metadata))
+            else:
+                task = asyncio.create_task(
+                    asyncio.to_thread(process_fn, context, metadata)
+                )
+            if pending is not None:
+                j, prev_task = pending
+                results[j] = await prev_task
+                previous_summary = self._summarize(results[j])
+            pending = (i, task)
+
+        j, task = pending
+        results[j] = await task
+        return results
+
     def _create_windows(self, source: str) -> list[tuple[str, dict]]:
         """Create overlapping windows from source code."""
         windows = []
         
-        total_tokens = self.llm.count_tokens(source)
+        # Shares the memoized full-file count with MemoryManager.analyze,
+        # so picking the sliding strategy and windowing the same source
+        # tokenizes it once
+        total_tokens = _cached_token_count(self.llm, source)
         window_size = self.config.available_input_tokens
         overlap = self.config.chunk_overlap_tokens
         
@@ -295,31 +745,24 @@ class SlidingWindowProcessor:
         chars_per_token = len(source) / total_tokens
         window_chars = int(window_size * chars_per_token)
         overlap_chars = int(overlap * chars_per_token)
-        
-        start = 0
-        window_idx = 0
-        
-        while start < len(source):
-            end = min(start + window_chars, len(source))
-            
-            # Try to end at a newline
-            if end < len(source):
-                newline_pos = source.rfind('\n', start, end)
-                if newline_pos > start:
-                    end = newline_pos + 1
-            
+
+        # Resolve the (start, end) ranges first: newline snapping makes
+        # the window count data-dependent, and knowing it up front lets
+        # each metadata dict carry its total from construction instead
+        # of a second mutation pass over the list
+        newlines = np.fromiter(
+            (m.start() for m in _NEWLINE_RE.finditer(source)), dtype=np.int64
+        )
+        ranges = _window_ranges(len(source), newlines, window_chars, overlap_chars)
+
+        total = len(ranges)
+        for window_idx, (start, end) in enumerate(ranges):
             windows.append((
                 source[start:end],
-                {"window": window_idx, "start_char": start, "end_char": end}
+                {"window": window_idx, "start_char": start,
+                 "end_char": end, "total": total}
             ))
-            
-            start = end - overlap_chars
-            window_idx += 1
-        
-        # Add total count to metadata
-        for text, meta in windows:
-            meta["total"] = window_idx
-        
+
         return windows
     
     def _summarize(self, result) -> str:
@@ -350,59 +793,102 @@ class HierarchicalSummarizer:
     def __init__(self, config: MemoryConfig, llm):
         self.config = config
         self.llm = llm
-        self.summaries: dict[int, dict[str, str]] = {0: {}, 1: {}, 2: {}, 3: {}}
-    
-    def build_hierarchy(self, chunks: list[ChunkMetadata], source: str):
+        # Structure-of-arrays per level: get_context only ever scans a
+        # whole level, so parallel key/text lists beat nested dicts, and
+        # the per-summary token counts are paid once at build time
+        self.summaries_key: list[list[str]] = [[], [], [], []]
+        self.summaries_text: list[list[str]] = [[], [], [], []]
+        self.token_counts: list = [None, None, None, None]
+
+    def build_hierarchy(self, chunks: list[ChunkMetadata], source: str | SourceView):
         """Build the complete summary hierarchy."""
-        # Level 0: Summarize each chunk
-        for chunk in chunks:
-            text = self._get_chunk_text(source, chunk)
-            summary = self._summarize_chunk(text, chunk.chunk_type)
-            self.summaries[0][chunk.chunk_id] = summary
-        
+        # Level 0: look up each chunk by content hash, then summarize
+        # only the misses as one batch so backends that serve concurrent
+        # requests amortize the per-call round trip
+        view = source if isinstance(source, SourceView) else SourceView(source)
+        texts = [self._get_chunk_text(view, chunk) for chunk in chunks]
+        keys = [
+            _content_key(chunk.chunk_type, text)
+            for chunk, text in zip(chunks, texts)
+        ]
+        summaries = [_summary_cache_get(key) for key in keys]
+        misses = [i for i, summary in enumerate(summaries) if summary is None]
+        if misses:
+            prompts = [
+                f"Summarize this {chunks[i].chunk_type} in 2 sentences:\n{texts[i]}"
+                for i in misses
+            ]
+            batch = getattr(self.llm, "generate_batch", None)
+            if batch is not None:
+                fresh = batch(prompts, max_tokens=100)
+            else:
+                fresh = [self.llm.generate(p, max_tokens=100) for p in prompts]
+            for i, summary in zip(misses, fresh):
+                summaries[i] = summary
+                _summary_cache_put(keys[i], summary)
+        self.summaries_key[0] = [chunk.chunk_id for chunk in chunks]
+        self.summaries_text[0] = summaries
+
         # Level 1: Group by parent scope (module)
         modules = {}
-        for chunk in chunks:
+        for chunk, summary in zip(chunks, summaries):
             scope = chunk.parent_scope or "main"
             if scope not in modules:
                 modules[scope] = []
-            modules[scope].append(self.summaries[0][chunk.chunk_id])
-        
-        for module, chunk_summaries in modules.items():
-            self.summaries[1][module] = self._merge_summaries(chunk_summaries)
-        
+            modules[scope].append(summary)
+
+        self.summaries_key[1] = list(modules)
+        self.summaries_text[1] = [
+            self._merge_summaries(chunk_summaries)
+            for chunk_summaries in modules.values()
+        ]
+
         # Level 2 & 3: Further aggregation as needed
-        if len(self.summaries[1]) > 1:
-            all_module_summaries = list(self.summaries[1].values())
-            self.summaries[2]["project"] = self._merge_summaries(all_module_summaries)
-    
+        if len(modules) > 1:
+            self.summaries_key[2] = ["project"]
+            self.summaries_text[2] = [
+                self._merge_summaries(self.summaries_text[1])
+            ]
+
+        # Token counts per summary, measured once here instead of on
+        # every get_context call
+        self.token_counts = [
+            np.asarray([self.llm.count_tokens(s) for s in level], dtype=np.int64)
+            for level in self.summaries_text
+        ]
+
     def get_context(self, query: str, max_tokens: int) -> str:
         """Get appropriate context level for a query."""
         # Start with highest level summary
-        context = self.summaries.get(2, {}).get("project", "")
-        tokens = self.llm.count_tokens(context)
-        
-        # Add more detail if space allows
-        if tokens < max_tokens * 0.5:
-            for module_summary in self.summaries.get(1, {}).values():
-                if tokens + self.llm.count_tokens(module_summary) < max_tokens:
-                    context += f"\n\n{module_summary}"
-                    tokens = self.llm.count_tokens(context)
-        
-        return context
-    
-    def _summarize_chunk(self, text: str, chunk_type: str) -> str:
-        prompt = f"Summarize this {chunk_type} in 2 sentences:\n{text}"
-        return self.llm.generate(prompt, max_tokens=100)
+        if self.summaries_text[2]:
+            parts = [self.summaries_text[2][0]]
+            tokens = int(self.token_counts[2][0])
+        else:
+            parts = [""]
+            tokens = 0
+
+        # Add module detail if space allows: counts are precomputed, so
+        # one cumulative sum picks the fitting prefix without running
+        # the tokenizer per summary per call
+        if tokens < max_tokens * 0.5 and self.summaries_text[1]:
+            fits = np.cumsum(self.token_counts[1]) + tokens < max_tokens
+            n = int(np.count_nonzero(fits))
+            parts.extend(self.summaries_text[1][:n])
+
+        return "\n\n".join(parts)
     
     def _merge_summaries(self, summaries: list[str]) -> str:
         combined = "\n".join(summaries)
-        prompt = f"Merge these summaries into one coherent paragraph:\n{combined}"
-        return self.llm.generate(prompt, max_tokens=200)
-    
-    def _get_chunk_text(self, source: str, chunk: ChunkMetadata) -> str:
-        lines = source.split('\n')
-        return '\n'.join(lines[chunk.start_line-1:chunk.end_line])
+        key = _content_key("merge", combined)
+        merged = _summary_cache_get(key)
+        if merged is None:
+            prompt = f"Merge these summaries into one coherent paragraph:\n{combined}"
+            merged = self.llm.generate(prompt, max_tokens=200)
+            _summary_cache_put(key, merged)
+        return merged
+    
+    def _get_chunk_text(self, view: SourceView, chunk: ChunkMetadata) -> str:
+        return view.line_slice(chunk.start_line, chunk.end_line)
 
 
 class MemoryManager:
@@ -427,9 +913,16 @@ class MemoryManager:
         """
         Analyze source code with automatic memory strategy selection.
         """
-        total_tokens = self.llm.count_tokens(source_code)
+        # Code averages well above 2 chars/token, so a short source
+        # cannot overflow the window: pick "direct" from the byte length
+        # alone and skip the full tokenization pass
+        if len(source_code) < self.config.available_input_tokens * 2:
+            logger.info("Small source, using direct processing strategy")
+            return {"strategy": "direct", "source": source_code}
+
+        total_tokens = _cached_token_count(self.llm, source_code)
         logger.info(f"Source code size: {total_tokens} tokens")
-        
+
         if total_tokens <= self.config.available_input_tokens:
             # Small file: direct processing
             logger.info("Using direct processing strategy")
@@ -438,15 +931,18 @@ class MemoryManager:
         elif total_tokens <= self.config.available_input_tokens * 4:
             # Medium file: sliding window
             logger.info("Using sliding window strategy")
-            chunks = self.chunker.chunk_file(source_code, language)
+            chunks = self.chunker.chunk_file(SourceView(source_code), language)
             return {"strategy": "sliding", "chunks": chunks}
-        
+
         else:
-            # Large file: RAG + hierarchical
+            # Large file: fuse the chunk/embed/summarize passes over one
+            # shared view so the source is encoded and line-indexed once
+            # instead of once per stage
             logger.info("Using RAG + hierarchical strategy")
-            chunks = self.chunker.chunk_file(source_code, language)
-            self.rag.index_codebase(chunks, source_code)
-            self.summarizer.build_hierarchy(chunks, source_code)
+            view = SourceView(source_code)
+            chunks = self.chunker.chunk_file(view, language)
+            self.rag.index_codebase(chunks, view)
+            self.summarizer.build_hierarchy(chunks, view)
             return {
                 "strategy": "rag",
                 "chunks": chunks,
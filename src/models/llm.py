@@ -8,10 +8,23 @@ Author: LegacyLens AI Architect
 """
 
 from __future__ import annotations
+import asyncio
+import gzip
+import hashlib
+import importlib.util
 import os
+import platform
+import tempfile
+import threading
+import queue
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Literal, Generator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
@@ -23,11 +36,38 @@ class ModelBackend(str, Enum):
     """Supported inference backends."""
     LLAMA_CPP = "llama_cpp"
     MLX = "mlx"
+    MLC = "mlc"
     LANGCHAIN = "langchain"
 
 
+def _default_n_threads() -> int:
+    """Thread count matched to the machine instead of a hardcoded 8.
+
+    Eight threads under-uses the 10-16 performance cores on larger Apple
+    Silicon and oversubscribes 4-P-core machines into context-switch
+    stalls; cap at 16 since llama.cpp gains little beyond that.
+    """
+    return min(16, os.cpu_count() or 8)
+
+
+class SamplingMode(str, Enum):
+    """How the sampler picks the next token.
+
+    GREEDY takes the argmax and skips the per-token top-k/top-p sort
+    entirely; at the near-zero temperatures used for code generation
+    the output is nearly identical, so greedy is the default for
+    deterministic tasks. NUCLEUS keeps the configured temperature/top_p
+    for calls that need variation (e.g. retries after a failed
+    validation, where re-decoding the same tokens would re-fail).
+    """
+    GREEDY = "greedy"
+    NUCLEUS = "nucleus"
+
+
 class QuantizationType(str, Enum):
     """GGUF quantization levels."""
+    Q2_K = "Q2_K"
+    Q3_K_M = "Q3_K_M"
     Q4_0 = "Q4_0"
     Q4_K_M = "Q4_K_M"
     Q5_K_M = "Q5_K_M"
@@ -35,6 +75,119 @@ class QuantizationType(str, Enum):
     Q8_0 = "Q8_0"
 
     
+# llama.cpp's grammars/json.gbnf: constrains sampling to well-formed
+# JSON objects, so the Archaeologist cannot emit unparseable output
+# and trigger a whole retry iteration over a stray token
+JSON_GRAMMAR = r"""
+root   ::= object
+value  ::= object | array | string | number | ("true" | "false" | "null") ws
+
+object ::=
+  "{" ws (
+            string ":" ws value
+    ("," ws string ":" ws value)*
+  )? "}" ws
+
+array  ::=
+  "[" ws (
+            value
+    ("," ws value)*
+  )? "]" ws
+
+string ::=
+  "\"" (
+    [^"\\\x7F\x00-\x1F] |
+    "\\" (["\\bfnrt/] | "u" [0-9a-fA-F]{4})
+  )* "\"" ws
+
+number ::= ("-"? ([0-9] | [1-9] [0-9]{0,15})) ("." [0-9]+)? ([eE] [-+]? [0-9] [1-9]{0,15})? ws
+
+ws ::= | " " | "\n" [ \t]{0,20}
+"""
+
+
+@lru_cache(maxsize=8)
+def _compiled_grammar(grammar: str):
+    """Compile GBNF text once; parsing the grammar is not free."""
+    from llama_cpp import LlamaGrammar
+    return LlamaGrammar.from_string(grammar, verbose=False)
+
+
+# Cold tier of TieredPromptCache: gzip-compressed token ids, keyed by
+# content hash, shared across runs
+_PROMPT_TOKEN_CACHE_DIR = Path(
+    os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+) / "legacylens" / "prompt_tokens"
+
+
+class TieredPromptCache:
+    """Two-tier cache of tokenized prompt text.
+
+    The hot tier is a FIFO OrderedDict of token-id arrays capped by
+    total token count (sized to a fraction of n_ctx, so it behaves like
+    the context window's L1). Entries evicted from the hot tier are
+    demoted to a cold tier of gzip-compressed token ids on disk and
+    paged back in on the next fault. Retry loops re-tokenize the same
+    system prompts and few-shot blocks constantly; this turns those BPE
+    walks into a dict probe (hot) or one small file read (cold) while,
+    unlike an unbounded memo, evicting stale history instead of pinning
+    it in RAM.
+    """
+
+    def __init__(self, capacity_tokens: int, cache_dir: Optional[Path] = None):
+        self.capacity_tokens = capacity_tokens
+        self.cache_dir = cache_dir or _PROMPT_TOKEN_CACHE_DIR
+        self._hot: OrderedDict[str, array] = OrderedDict()
+        self._hot_tokens = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get(self, text: str) -> Optional[array]:
+        """Token ids for text, or None if neither tier has them."""
+        key = self._key(text)
+        tokens = self._hot.get(key)
+        if tokens is not None:
+            return tokens
+        return self._page_in(key)
+
+    def put(self, text: str, tokens: list[int]) -> array:
+        entry = array("i", tokens)
+        self._admit(self._key(text), entry)
+        return entry
+
+    def _admit(self, key: str, tokens: array) -> None:
+        self._hot[key] = tokens
+        self._hot_tokens += len(tokens)
+        while self._hot_tokens > self.capacity_tokens and len(self._hot) > 1:
+            evicted_key, evicted = self._hot.popitem(last=False)
+            self._hot_tokens -= len(evicted)
+            self._demote(evicted_key, evicted)
+
+    def _page_in(self, key: str) -> Optional[array]:
+        """Restore a demoted entry from disk; None on a cold miss."""
+        try:
+            blob = gzip.decompress((self.cache_dir / key).read_bytes())
+        except OSError:
+            return None
+        tokens = array("i")
+        tokens.frombytes(blob)
+        self._admit(key, tokens)
+        return tokens
+
+    def _demote(self, key: str, tokens: array) -> None:
+        """Write an evicted entry to the cold tier; failures non-fatal."""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(tokens.tobytes()))
+            os.replace(tmp_name, self.cache_dir / key)
+        except OSError:
+            pass
+
+
 @dataclass
 class ModelConfig:
     """Configuration for model loading and inference."""
@@ -42,15 +195,22 @@ class ModelConfig:
     model_name: str = "mistral-small-3"
     quantization: QuantizationType = QuantizationType.Q4_K_M
     n_gpu_layers: int = -1  # -1 = all layers on Metal GPU
-    n_batch: int = 512
+    # Large logical batch so prefill issues big Metal command buffers;
+    # n_ubatch bounds the physical micro-batch that actually runs
+    n_batch: int = 2048
+    n_ubatch: int = 512
     n_ctx: int = 8192
     max_tokens: int = 4096
+    # FIFO window over conversational history passed to generate();
+    # attention cost grows quadratically with kept messages
+    history_window: int = 16
     temperature: float = 0.1
     top_p: float = 0.95
     top_k: int = 40
     repeat_penalty: float = 1.1
-    n_threads: int = 8  # M2 Pro performance cores
-    n_threads_batch: int = 8
+    sampling_mode: SamplingMode = SamplingMode.NUCLEUS
+    n_threads: int = field(default_factory=_default_n_threads)
+    n_threads_batch: int = field(default_factory=_default_n_threads)
     use_mmap: bool = True
     use_mlock: bool = False
     verbose: bool = False
@@ -58,8 +218,8 @@ class ModelConfig:
     @classmethod
     def for_mistral_small(cls, model_path: str, quantization: QuantizationType = QuantizationType.Q4_K_M):
         """Optimized config for Mistral-Small-3 24B."""
-        return cls(model_path=model_path, model_name="mistral-small-3-24b", 
-                   quantization=quantization, n_ctx=8192, n_batch=512)
+        return cls(model_path=model_path, model_name="mistral-small-3-24b",
+                   quantization=quantization, n_ctx=8192)
     
     @classmethod
     def for_qwen_coder(cls, model_path: str, quantization: QuantizationType = QuantizationType.Q4_K_M):
@@ -69,12 +229,31 @@ class ModelConfig:
             model_name="qwen2.5-coder-7b",
             quantization=quantization, 
             n_ctx=8192,  # Qwen supports up to 32K but 8K is more efficient
-            n_batch=512,
             max_tokens=4096,
             temperature=0.1,  # Low temp for code generation
+            sampling_mode=SamplingMode.GREEDY,  # argmax; skips sampler sort
             n_gpu_layers=-1,  # All layers on Metal
         )
 
+    @classmethod
+    def for_qwen_coder_fast(cls, model_path: str):
+        """Qwen2.5-Coder-7B pinned to Q4_0 for maximum decode speed.
+
+        Decode on Apple Silicon is memory-bandwidth bound, so the
+        simpler Q4_0 layout streams weights ~20% faster than Q4_K_M on
+        Metal. The quality loss is minor for code generation; prefer
+        for_qwen_coder when output fidelity matters more than latency.
+        """
+        return cls(
+            model_path=model_path,
+            model_name="qwen2.5-coder-7b",
+            quantization=QuantizationType.Q4_0,
+            n_ctx=8192,
+            max_tokens=4096,
+            temperature=0.1,
+            n_gpu_layers=-1,
+        )
+
 
 class LegacyLensLLM:
     """High-performance LLM wrapper optimized for Apple Silicon."""
@@ -84,62 +263,475 @@ class LegacyLensLLM:
         self.backend = backend
         self._model = None
         self._tokenizer = None
+        self._token_cache: Optional[TieredPromptCache] = None
+        self.langchain_llm = None  # set by the LANGCHAIN loader
+        self._system_token_ids: dict[str, list[int]] = {}
+        # One llama.cpp context decodes one sequence at a time and is not
+        # thread-safe; the shared instance serializes generate() calls
+        self._generate_lock = threading.Lock()
         self._load_model()
     
     def _load_model(self) -> None:
-        if self.backend == ModelBackend.LLAMA_CPP:
-            self._load_llama_cpp()
-        elif self.backend == ModelBackend.MLX:
-            self._load_mlx()
-        elif self.backend == ModelBackend.LANGCHAIN:
-            self._load_langchain()
-    
+        loader = self._BACKEND_LOADERS.get(self.backend)
+        if loader is None:
+            raise ValueError(f"No loader registered for backend {self.backend!r}")
+        loader(self)
+
+    def _should_mlock(self) -> bool:
+        """Pin weights in RAM when the machine can clearly afford it.
+
+        Without mlock the kernel may page mmapped weights out between
+        tokens, stalling GPU bursts on page-ins mid-decode. Pinning a
+        model bigger than available memory would thrash instead, so
+        require 1.5x the file size free; with no psutil, stay unpinned.
+        """
+        if self.config.use_mlock:
+            return True
+        try:
+            import psutil
+            model_size = os.path.getsize(self.config.model_path)
+        except (ImportError, OSError):
+            return False
+        return psutil.virtual_memory().available > model_size * 1.5
+
     def _load_llama_cpp(self) -> None:
         from llama_cpp import Llama
         logger.info(f"Loading model: {self.config.model_path}")
         self._model = Llama(
             model_path=self.config.model_path, n_ctx=self.config.n_ctx,
-            n_batch=self.config.n_batch, n_gpu_layers=self.config.n_gpu_layers,
-            n_threads=self.config.n_threads, use_mmap=self.config.use_mmap,
+            n_batch=self.config.n_batch, n_ubatch=self.config.n_ubatch,
+            n_gpu_layers=self.config.n_gpu_layers,
+            n_threads=self.config.n_threads,
+            n_threads_batch=self.config.n_threads_batch,
+            use_mmap=self.config.use_mmap,
+            use_mlock=self._should_mlock(),
             verbose=self.config.verbose,
         )
+        # The GGUF file embeds its own quantization (general.file_type);
+        # log it against the config so a mislabeled download is visible
+        metadata = getattr(self._model, "metadata", None) or {}
+        embedded_ftype = metadata.get("general.file_type")
+        if embedded_ftype is not None:
+            logger.info(
+                f"GGUF file_type={embedded_ftype}, "
+                f"requested quantization={self.config.quantization.value}"
+            )
+        # Retry loops resend prompts sharing a large invariant prefix
+        # (system prompt + few-shot examples); the RAM cache keys KV
+        # state by longest common prefix so only the suffix re-prefills
+        try:
+            from llama_cpp import LlamaRAMCache
+            self._model.set_cache(LlamaRAMCache(capacity_bytes=2 << 30))
+        except (ImportError, AttributeError):
+            pass  # Older llama-cpp-python without cache support
+        # Tokenization tier above the KV cache: hot FIFO sized to half
+        # the context window, cold gzip tier on disk
+        self._token_cache = TieredPromptCache(self.config.n_ctx // 2)
+        # Every agent's system prefix, tokenized once; the raw-token
+        # path reuses these instead of re-rendering the chat template
+        from ..prompts.templates import SYSTEM_PROMPTS
+        self._system_token_ids = {
+            name: self._model.tokenize(text.encode())
+            for name, text in SYSTEM_PROMPTS.items()
+        }
+        self._verify_gpu_offload()
         logger.info("Model loaded with Metal acceleration")
+
+    def _verify_gpu_offload(self) -> None:
+        """Fail fast when GPU layers were requested but cannot engage.
+
+        A llama-cpp-python wheel built without Metal silently runs the
+        whole model on CPU, a 10-100x slowdown that otherwise only shows
+        up as mysteriously slow generations. Raising at load time turns
+        that into an actionable install error on Apple Silicon; other
+        platforms may legitimately run CPU-only, so they just warn.
+        """
+        if self.config.n_gpu_layers == 0:
+            return
+        try:
+            import llama_cpp
+            supported = bool(llama_cpp.llama_supports_gpu_offload())
+        except (ImportError, AttributeError):
+            return  # Too old to introspect; nothing reliable to check
+        if supported:
+            return
+        if platform.system() == "Darwin":
+            raise RuntimeError(
+                "llama-cpp-python was built without Metal support; reinstall "
+                "with CMAKE_ARGS='-DLLAMA_METAL=on' pip install "
+                "--force-reinstall --no-cache-dir llama-cpp-python"
+            )
+        logger.warning(
+            f"GPU offload unavailable; n_gpu_layers={self.config.n_gpu_layers} "
+            "will run on CPU"
+        )
     
     def _load_mlx(self) -> None:
         from mlx_lm import load, generate
         self._model, self._tokenizer = load(self.config.model_path)
         self._mlx_generate = generate
+        try:
+            # Persistent KV cache: successive prompts sharing a prefix
+            # skip re-prefilling it, mirroring the llama.cpp RAM cache
+            from mlx_lm.models.cache import make_prompt_cache
+            self._mlx_prompt_cache = make_prompt_cache(self._model)
+        except ImportError:
+            self._mlx_prompt_cache = None
     
+    def _load_mlc(self) -> None:
+        # Paged-KV engine with continuous batching; strongest decode
+        # throughput of the supported backends where its runtime exists
+        from mlc_llm import MLCEngine
+        self._model = MLCEngine(self.config.model_path)
+
     def _load_langchain(self) -> None:
-        from langchain_community.llms import LlamaCpp
-        self._model = LlamaCpp(
-            model_path=self.config.model_path, n_ctx=self.config.n_ctx,
-            n_gpu_layers=self.config.n_gpu_layers, temperature=self.config.temperature,
-        )
-    
-    def generate(self, prompt: str, system_prompt: Optional[str] = None,
-                 max_tokens: Optional[int] = None, stop: Optional[list[str]] = None) -> str:
+        # LangChain's own LlamaCpp wrapper duplicated _load_llama_cpp
+        # with less tuning (no n_batch/n_threads/use_mmap, and it often
+        # ends up CPU-only); reuse the tuned loader and expose the same
+        # context behind a LangChain-compatible shim instead
+        self._load_llama_cpp()
+        self.langchain_llm = _make_langchain_adapter(self._model, self.config)
+
+    # Backend -> loader registry; each loader imports its runtime
+    # lazily, so only the selected backend's package ever loads
+    # (mlx_lm startup alone costs hundreds of ms)
+    _BACKEND_LOADERS = {
+        ModelBackend.LLAMA_CPP: _load_llama_cpp,
+        ModelBackend.MLX: _load_mlx,
+        ModelBackend.MLC: _load_mlc,
+        ModelBackend.LANGCHAIN: _load_langchain,
+    }
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str],
+                        history: Optional[list[dict]]) -> list[dict]:
+        """Assemble the chat payload, clipping history to a FIFO window.
+
+        An unbounded history grows attention cost quadratically and
+        eventually overflows n_ctx mid-run; keeping the leading system
+        message plus the most recent history_window entries bounds both.
+        Payloads beyond 75% of n_ctx are rejected up front so the
+        completion always has decode room.
+        """
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
+        if history:
+            kept = history
+            if kept[0].get("role") == "system":
+                # The conversation's own system message survives the
+                # window even when everything after it slides out
+                if not system_prompt:
+                    messages.append(kept[0])
+                kept = kept[1:]
+            messages.extend(kept[-self.config.history_window:])
         messages.append({"role": "user", "content": prompt})
-        
-        response = self._model.create_chat_completion(
-            messages=messages, max_tokens=max_tokens or self.config.max_tokens,
-            temperature=self.config.temperature, stop=stop or ["```\n\n"],
+
+        budget = int(self.config.n_ctx * 0.75)
+        total = sum(self.count_tokens(m["content"]) for m in messages)
+        if total > budget:
+            raise ValueError(
+                f"Prompt payload is {total} tokens; the limit is {budget} "
+                f"(75% of n_ctx={self.config.n_ctx}) to leave decode room"
+            )
+        return messages, total
+
+    def _decode_budget(self, prompt_tokens: int, max_tokens: Optional[int]) -> int:
+        """Decode tokens that actually fit after the prompt.
+
+        llama.cpp silently truncates when prompt + max_tokens overflows
+        n_ctx, producing an expensive bad generation the validator then
+        retries. An explicit max_tokens that cannot fit is a caller bug
+        and raises; the config default is clamped to the window.
+        """
+        budget = self.config.n_ctx - prompt_tokens - 64  # EOS/stop headroom
+        if max_tokens is not None and max_tokens > budget:
+            raise ValueError(
+                f"Prompt ({prompt_tokens} tokens) + max_tokens ({max_tokens}) "
+                f"exceeds n_ctx={self.config.n_ctx}; at most {budget} decode "
+                f"tokens fit"
+            )
+        return min(max_tokens or self.config.max_tokens, budget)
+
+    def _sampling_kwargs(self, sampling_mode: Optional[SamplingMode]) -> dict:
+        """Sampler parameters for the effective mode."""
+        mode = sampling_mode or self.config.sampling_mode
+        if mode == SamplingMode.GREEDY:
+            # top_k=1 fast-paths to argmax: no per-token top-k/top-p sort
+            return {"temperature": 0.0, "top_k": 1}
+        return {
+            "temperature": self.config.temperature,
+            "top_p": self.config.top_p,
+            "top_k": self.config.top_k,
+        }
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 max_tokens: Optional[int] = None, stop: Optional[list[str]] = None,
+                 history: Optional[list[dict]] = None,
+                 grammar: Optional[str] = None,
+                 sampling_mode: Optional[SamplingMode] = None) -> str:
+        # Greedy (or near-greedy) sampling makes identical inputs
+        # produce identical outputs, and Engineer retries resend
+        # identical prompts, so the call is memoized on a hashable tuple
+        # form of the payload. Stochastic configs bypass the memo so it
+        # cannot freeze the variation the temperature is there to provide.
+        mode = sampling_mode or self.config.sampling_mode
+        if mode == SamplingMode.GREEDY or self.config.temperature < 0.05:
+            stop_t = tuple(stop) if stop else None
+            history_t = (
+                tuple((m["role"], m["content"]) for m in history)
+                if history else None
+            )
+            return _generate_memo(self, prompt, system_prompt, max_tokens,
+                                  stop_t, history_t, grammar, mode)
+        return self._generate(prompt, system_prompt, max_tokens, stop, history,
+                              grammar, mode)
+
+    def _generate(self, prompt: str, system_prompt: Optional[str],
+                  max_tokens: Optional[int], stop: Optional[list[str]],
+                  history: Optional[list[dict]],
+                  grammar: Optional[str] = None,
+                  sampling_mode: Optional[SamplingMode] = None) -> str:
+        # Grammar-constrained sampling is llama.cpp-only; the MLX/MLC
+        # paths fall back to the prompt's own formatting instructions
+        if self.backend == ModelBackend.MLX:
+            return self._generate_mlx(prompt, system_prompt, max_tokens, history)
+        if self.backend == ModelBackend.MLC:
+            return self._generate_mlc(prompt, system_prompt, max_tokens, history)
+        return "".join(self.generate_stream(prompt, system_prompt, max_tokens,
+                                            stop, history, grammar, sampling_mode))
+
+    def _generate_mlc(self, prompt: str, system_prompt: Optional[str],
+                      max_tokens: Optional[int],
+                      history: Optional[list[dict]] = None) -> str:
+        """Generate through MLCEngine's OpenAI-style chat API."""
+        messages, _ = self._build_messages(prompt, system_prompt, history)
+        with self._generate_lock:
+            response = self._model.chat.completions.create(
+                messages=messages,
+                max_tokens=max_tokens or self.config.max_tokens,
+                temperature=self.config.temperature,
+            )
+        return response.choices[0].message.content
+
+    def _generate_mlx(self, prompt: str, system_prompt: Optional[str],
+                      max_tokens: Optional[int],
+                      history: Optional[list[dict]] = None) -> str:
+        """Generate through mlx_lm using the model's own chat template."""
+        messages, prompt_tokens = self._build_messages(prompt, system_prompt, history)
+        text = self._tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
         )
-        return response["choices"][0]["message"]["content"]
-    
+        kwargs = {"max_tokens": self._decode_budget(prompt_tokens, max_tokens)}
+        if self._mlx_prompt_cache is not None:
+            kwargs["prompt_cache"] = self._mlx_prompt_cache
+        with self._generate_lock:
+            return self._mlx_generate(self._model, self._tokenizer, text, **kwargs)
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                        max_tokens: Optional[int] = None,
+                        stop: Optional[list[str]] = None,
+                        history: Optional[list[dict]] = None,
+                        grammar: Optional[str] = None,
+                        sampling_mode: Optional[SamplingMode] = None) -> Generator[str, None, None]:
+        """Yield completion text as it decodes.
+
+        Callers see the first token at first-token latency instead of
+        after the full completion; generate() is a join over this stream.
+        The lock is held until the stream is exhausted (or closed), since
+        the llama.cpp context decodes one sequence at a time.
+        """
+        messages, prompt_tokens = self._build_messages(prompt, system_prompt, history)
+
+        with self._generate_lock:
+            stream = self._model.create_chat_completion(
+                messages=messages,
+                max_tokens=self._decode_budget(prompt_tokens, max_tokens),
+                stop=stop or ["```\n\n"],
+                grammar=_compiled_grammar(grammar) if grammar else None,
+                stream=True,
+                **self._sampling_kwargs(sampling_mode),
+            )
+            for chunk in stream:
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
+    def generate_batch(self, prompts: list[str], system_prompt: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> list[str]:
+        """Generate completions for several prompts, preserving order.
+
+        Requests are issued from a small thread pool so backends that can
+        serve concurrently (LangChain/remote) overlap network and prefill
+        latency; with the single llama.cpp context the generate lock
+        serializes actual decoding, so this degrades to the loop it
+        replaces rather than oversubscribing the model.
+        """
+        if len(prompts) <= 1:
+            return [self.generate(p, system_prompt, max_tokens) for p in prompts]
+        with ThreadPoolExecutor(max_workers=min(8, len(prompts))) as pool:
+            return list(pool.map(
+                lambda p: self.generate(p, system_prompt, max_tokens), prompts
+            ))
+
+    def generate_from_tokens(self, system_name: str, user_prompt: str,
+                             max_tokens: Optional[int] = None,
+                             sampling_mode: Optional[SamplingMode] = None) -> str:
+        """Raw-token completion over a pre-tokenized system prefix.
+
+        Skips the chat-template rendering inside llama.cpp and feeds
+        token ids directly, so the system prefix is byte-identical every
+        call and the KV prompt cache always hits on it. system_name is a
+        key of templates.SYSTEM_PROMPTS ("archaeologist", "engineer",
+        ...). llama.cpp-only; trades the chat formatting for latency.
+        """
+        if self.backend != ModelBackend.LLAMA_CPP and self.backend != ModelBackend.LANGCHAIN:
+            raise ValueError("generate_from_tokens requires a llama.cpp context")
+        ids = list(self._system_token_ids[system_name])
+        ids += self._model.tokenize(f"\n\n{user_prompt}\n".encode(), add_bos=False)
+        budget = self._decode_budget(len(ids), max_tokens)
+        sampling = self._sampling_kwargs(sampling_mode)
+        produced: list[int] = []
+        with self._generate_lock:
+            eos = self._model.token_eos()
+            for token in self._model.generate(
+                ids, temp=sampling["temperature"],
+                top_k=sampling.get("top_k", self.config.top_k),
+                top_p=sampling.get("top_p", self.config.top_p),
+            ):
+                if token == eos:
+                    break
+                produced.append(token)
+                if len(produced) >= budget:
+                    break
+        return self._model.detokenize(produced).decode("utf-8", errors="ignore")
+
+    async def generate_many(self, prompts: list[str], system_prompt: Optional[str] = None,
+                            max_tokens: Optional[int] = None) -> list[str]:
+        """Async fan-out over independent prompts, preserving order.
+
+        Each call runs in a worker thread so the event loop (and the
+        other agents on it) stays responsive while this context decodes.
+        """
+        semaphore = asyncio.Semaphore(min(8, max(1, len(prompts))))
+
+        async def _one(prompt: str) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self.generate, prompt, system_prompt, max_tokens
+                )
+
+        return list(await asyncio.gather(*(_one(p) for p in prompts)))
+
+    def _tokenize(self, text: str) -> "array | list[int]":
+        """Tokenize through the tiered cache when one is attached."""
+        cache = self._token_cache
+        if cache is None:
+            return self._model.tokenize(text.encode())
+        tokens = cache.get(text)
+        if tokens is None:
+            tokens = cache.put(text, self._model.tokenize(text.encode()))
+        return tokens
+
     def count_tokens(self, text: str) -> int:
-        return len(self._model.tokenize(text.encode()))
+        if self._tokenizer is not None:  # MLX carries its own tokenizer
+            return len(self._tokenizer.encode(text))
+        if self._token_cache is not None:
+            return len(self._tokenize(text))
+        if not hasattr(self._model, "tokenize"):
+            return len(text) // 4  # chars-per-token estimate (MLC/LangChain)
+        return _count_tokens_cached(self._model, text)
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        """Count tokens for many texts, fanning out across threads.
+
+        llama.cpp's tokenizer is stateless and safe to call concurrently,
+        and the heavy lifting happens in C, so the pool overlaps the
+        per-text work instead of looping in the interpreter.
+        """
+        if len(texts) <= 1:
+            return [self.count_tokens(t) for t in texts]
+        with ThreadPoolExecutor(max_workers=min(8, len(texts))) as pool:
+            return list(pool.map(self.count_tokens, texts))
     
     @property
     def context_size(self) -> int:
         return self.config.n_ctx
 
 
-# Global model instance (loaded once)
-_global_model: Optional[LegacyLensLLM] = None
+def _make_langchain_adapter(model, config: ModelConfig):
+    """Wrap a tuned llama.cpp context in a LangChain-compatible LLM.
+
+    The class is built lazily so langchain_core only imports on the
+    LANGCHAIN backend; the adapter delegates to the already-loaded
+    context, keeping the Metal layer count and prompt cache.
+    """
+    from langchain_core.language_models.llms import LLM
+
+    class _LlamaCppAdapter(LLM):
+        class Config:
+            arbitrary_types_allowed = True
+
+        llama: object
+        max_tokens: int
+        temperature: float
+
+        @property
+        def _llm_type(self) -> str:
+            return "legacylens-llama-cpp"
+
+        def _call(self, prompt: str, stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs) -> str:
+            result = self.llama.create_completion(
+                prompt, max_tokens=self.max_tokens,
+                temperature=self.temperature, stop=stop,
+            )
+            return result["choices"][0]["text"]
+
+    return _LlamaCppAdapter(
+        llama=model, max_tokens=config.max_tokens, temperature=config.temperature
+    )
+
+
+@lru_cache(maxsize=256)
+def _generate_memo(llm: "LegacyLensLLM", prompt: str, system_prompt: Optional[str],
+                   max_tokens: Optional[int], stop_t: Optional[tuple[str, ...]],
+                   history_t: Optional[tuple[tuple[str, str], ...]],
+                   grammar: Optional[str] = None,
+                   sampling_mode: Optional[SamplingMode] = None) -> str:
+    """Memoized completion for near-greedy configs; see generate()."""
+    history = (
+        [{"role": role, "content": content} for role, content in history_t]
+        if history_t else None
+    )
+    return llm._generate(prompt, system_prompt, max_tokens,
+                         list(stop_t) if stop_t else None, history, grammar,
+                         sampling_mode)
+
+
+@lru_cache(maxsize=1024)
+def _count_tokens_cached(model, text: str) -> int:
+    """Memoized token counting; tokenization is pure per model.
+
+    System prompts and templates are re-counted constantly by retry
+    loops, so repeats become a dict probe instead of a BPE walk. Keying
+    on the model object keeps counts from a reloaded model separate.
+    """
+    return len(model.tokenize(text.encode()))
+
+
+def _default_backend(model_path: str) -> ModelBackend:
+    """Prefer MLX on Apple Silicon when it is installed.
+
+    GGUF files stay on llama.cpp regardless — mlx_lm loads HF-style
+    model directories, not GGUF blobs.
+    """
+    if (
+        platform.processor() == "arm"
+        and not model_path.endswith(".gguf")
+        and importlib.util.find_spec("mlx_lm") is not None
+    ):
+        return ModelBackend.MLX
+    return ModelBackend.LLAMA_CPP
 
 
 def load_model(model_path: str, model_type: Literal["mistral", "llama", "qwen"] = "qwen") -> LegacyLensLLM:
@@ -150,18 +742,152 @@ def load_model(model_path: str, model_type: Literal["mistral", "llama", "qwen"]
         config = ModelConfig.for_mistral_small(model_path)
     else:
         config = ModelConfig.for_llama_3_2(model_path)
-    return LegacyLensLLM(config)
+    return LegacyLensLLM(config, backend=_default_backend(model_path))
+
+
+class ModelPool:
+    """A small pool of llama.cpp contexts behind the LLM interface.
+
+    One context decodes one sequence at a time, so concurrent jobs used
+    to queue behind the single global instance. The pool checks contexts
+    out per call — growing lazily up to its size, with mmap sharing the
+    weights between instances — and exposes the same generate/count
+    surface the agents already use, so callers cannot tell it from a
+    single LegacyLensLLM.
+    """
+
+    def __init__(self, model_path: str, model_type: str = "qwen",
+                 size: Optional[int] = None):
+        self.model_path = model_path
+        self.model_type = model_type
+        self.size = size or max(1, min(4, (os.cpu_count() or 8) // 4))
+        self._contexts: queue.Queue[LegacyLensLLM] = queue.Queue()
+        self._grow_lock = threading.Lock()
+        # Warm one context up front, as the old single global did, so
+        # the first request never pays the model load; the rest of the
+        # pool grows on contention
+        self._contexts.put(load_model(model_path, model_type))
+        self._created = 1
+
+    def _checkout(self) -> LegacyLensLLM:
+        """Take a free context, growing the pool if under its cap."""
+        try:
+            return self._contexts.get_nowait()
+        except queue.Empty:
+            pass
+        with self._grow_lock:
+            grow = self._created < self.size
+            if grow:
+                self._created += 1
+        if grow:
+            return load_model(self.model_path, self.model_type)
+        return self._contexts.get()  # Block until a context frees up
+
+    @contextmanager
+    def acquire(self):
+        """Context manager yielding an exclusive model instance."""
+        model = self._checkout()
+        try:
+            yield model
+        finally:
+            self._contexts.put(model)
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 max_tokens: Optional[int] = None, stop: Optional[list[str]] = None,
+                 history: Optional[list[dict]] = None,
+                 grammar: Optional[str] = None,
+                 sampling_mode: Optional[SamplingMode] = None) -> str:
+        with self.acquire() as model:
+            return model.generate(prompt, system_prompt, max_tokens, stop,
+                                  history, grammar, sampling_mode)
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                        max_tokens: Optional[int] = None,
+                        stop: Optional[list[str]] = None,
+                        history: Optional[list[dict]] = None,
+                        grammar: Optional[str] = None,
+                        sampling_mode: Optional[SamplingMode] = None) -> Generator[str, None, None]:
+        with self.acquire() as model:
+            yield from model.generate_stream(prompt, system_prompt, max_tokens,
+                                             stop, history, grammar, sampling_mode)
+
+    def generate_batch(self, prompts: list[str], system_prompt: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> list[str]:
+        """Fan prompts across the pooled contexts, preserving order."""
+        if len(prompts) <= 1:
+            return [self.generate(p, system_prompt, max_tokens) for p in prompts]
+        with ThreadPoolExecutor(max_workers=min(self.size, len(prompts))) as pool:
+            return list(pool.map(
+                lambda p: self.generate(p, system_prompt, max_tokens), prompts
+            ))
+
+    async def generate_many(self, prompts: list[str], system_prompt: Optional[str] = None,
+                            max_tokens: Optional[int] = None) -> list[str]:
+        """Async fan-out across the pooled contexts, preserving order.
+
+        The semaphore matches the pool cap, so at most size sequences
+        decode concurrently (one per context) and the rest queue without
+        blocking the event loop.
+        """
+        semaphore = asyncio.Semaphore(self.size)
+
+        async def _one(prompt: str) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self.generate, prompt, system_prompt, max_tokens
+                )
+
+        return list(await asyncio.gather(*(_one(p) for p in prompts)))
+
+    def count_tokens(self, text: str) -> int:
+        with self.acquire() as model:
+            return model.count_tokens(text)
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        with self.acquire() as model:
+            return model.count_tokens_batch(texts)
+
+    @property
+    def context_size(self) -> int:
+        with self.acquire() as model:
+            return model.context_size
+
+
+# Global model pool (contexts loaded lazily on first use)
+_global_pool: Optional[ModelPool] = None
+
+
+def get_model() -> Optional[ModelPool]:
+    """Get the global model pool."""
+    global _global_pool
+    return _global_pool
+
+
+# Token cost of each invariant prompt constant, filled at startup so
+# budget checks read a dict instead of re-counting multi-KB strings
+TEMPLATE_TOKEN_COSTS: dict[str, int] = {}
+
 
+def _precompute_template_costs(model) -> dict[str, int]:
+    """Count the invariant prompt constants once, at startup.
 
-def get_model() -> Optional[LegacyLensLLM]:
-    """Get the global model instance."""
-    global _global_model
-    return _global_model
+    Also warms the token cache, so the first real generation's budget
+    check never pays a cold BPE walk over the few-shot blocks.
+    """
+    from ..prompts import templates
+    names = [
+        name for name in dir(templates)
+        if name.isupper() and isinstance(getattr(templates, name), str)
+    ]
+    counts = model.count_tokens_batch([getattr(templates, n) for n in names])
+    TEMPLATE_TOKEN_COSTS.update(zip(names, counts))
+    return TEMPLATE_TOKEN_COSTS
 
 
-def initialize_model(model_path: str, model_type: str = "qwen") -> LegacyLensLLM:
-    """Initialize and cache the global model."""
-    global _global_model
-    if _global_model is None:
-        _global_model = load_model(model_path, model_type)
-    return _global_model
+def initialize_model(model_path: str, model_type: str = "qwen") -> ModelPool:
+    """Initialize and cache the global model pool."""
+    global _global_pool
+    if _global_pool is None:
+        _global_pool = ModelPool(model_path, model_type)
+        _precompute_template_costs(_global_pool)
+    return _global_pool
@@ -7,8 +7,25 @@ Author: LegacyLens AI Architect
 """
 
 from __future__ import annotations
+import json
 from typing import Optional
-from string import Template
+
+try:
+    import orjson  # C-coded encoder; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
+
+def _dumps_compact(obj) -> str:
+    """Dump machine-consumed JSON with no cosmetic whitespace.
+
+    Indented JSON inflates the payload's token count by 20-30% for no
+    benefit to the model; orjson encodes compact by default and walks
+    the object in C.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
 
 
 # =============================================================================
@@ -41,9 +58,12 @@ Design Pattern Mapping Rules:
 | Legacy Pattern          | Modern Python Equivalent              |
 |-------------------------|---------------------------------------|
 | Manual memory (new/del) | Context managers, dataclasses         |
+| Raw binary file I/O     | np.memmap (demand paging)             |
+| Element-wise ofstream<< | np.savetxt / ndarray.tofile           |
 | Raw pointers            | Optional types, references            |
 | Mutex/locks             | asyncio.Lock, threading.Lock          |
 | Monolithic loops        | NumPy vectorization, list comps       |
+| Pointwise uint8 op      | 256-entry LUT (fused passes)          |
 | Callbacks               | async/await, Futures                  |
 | Singleton               | Module-level instance, dependency inj |
 | Factory pattern         | @classmethod, __init__ variants       |
@@ -66,6 +86,10 @@ Requirements:
 - TypeScript with strict mode
 - Tailwind CSS for styling
 
+Anti-patterns to avoid:
+- astype() chains (upcast → op → downcast): preallocate an output buffer
+  and use ufunc out= / np.clip(..., out=...) instead of per-call copies
+
 Generate complete, working code with proper error handling."""
 
 
@@ -100,6 +124,17 @@ Use Mermaid.js syntax for all diagrams:
 - classDiagram for structure"""
 
 
+# Name -> system prompt registry, so the model layer can pre-tokenize
+# every system prefix once at startup
+SYSTEM_PROMPTS = {
+    "archaeologist": ARCHAEOLOGIST_SYSTEM,
+    "architect": ARCHITECT_SYSTEM,
+    "engineer": ENGINEER_SYSTEM,
+    "validator": VALIDATOR_SYSTEM,
+    "scribe": SCRIBE_SYSTEM,
+}
+
+
 # =============================================================================
 # FEW-SHOT EXAMPLES
 # =============================================================================
@@ -329,16 +364,123 @@ user = User(name="John", email="john@example.com", age=30)
 """
 
 
+# Condensed variants of the few-shot examples, distilled offline (rate
+# ~0.3): prose and usage snippets dropped, code skeletons kept. Prefill
+# cost is linear in prompt tokens, so large jobs trade example richness
+# for input budget and time-to-first-token.
+
+CPP_TO_PYTHON_EXAMPLES_COMPRESSED = """
+### Manual memory (new/delete + destructor cleanup) -> context manager
+```cpp
+class FileProcessor { FILE* file; public:
+    FileProcessor(const char* p) { file = fopen(p, "r"); }
+    ~FileProcessor() { if (file) fclose(file); } };
+```
+```python
+@dataclass
+class FileProcessor:
+    path: Path
+    def __enter__(self): self._file = open(self.path); return self
+    def __exit__(self, *exc): self._file.close(); return False
+```
+
+### Monolithic loop -> NumPy vectorization
+```cpp
+for (int i = 0; i < size; i++) pixels[i] = pow(pixels[i]/255.0f, gamma)*255.0f;
+```
+```python
+def process(pixels: NDArray[np.float32], gamma: float) -> NDArray[np.float32]:
+    return (np.power(pixels / 255.0, gamma) * 255.0).astype(np.float32)
+```
+
+### Callback interface + thread -> async/await
+```java
+void fetchData(String url, DataCallback cb) { new Thread(() -> { ... }).start(); }
+```
+```python
+async def fetch_data(url: str) -> str:
+    async with aiohttp.ClientSession() as s, s.get(url) as r:
+        return await r.text()
+```
+"""
+
+
+JAVA_TO_PYTHON_EXAMPLES_COMPRESSED = """
+### Singleton (static getInstance) -> lru_cache module factory
+```java
+public static synchronized DatabaseConnection getInstance() {
+    if (instance == null) instance = new DatabaseConnection(); return instance; }
+```
+```python
+@lru_cache(maxsize=1)
+def get_database_connection():
+    return sessionmaker(bind=create_engine(DATABASE_URL))()
+```
+
+### Builder pattern -> dataclass with defaults
+```java
+public static class Builder { ... public User build() { return new User(this); } }
+```
+```python
+@dataclass
+class User:
+    name: str
+    email: str
+    age: int = 0
+```
+"""
+
+
 # =============================================================================
 # PROMPT TEMPLATES
 # =============================================================================
 
-ANALYSIS_PROMPT = Template("""
-Analyze the following $language code and extract the Logic Schema.
+# The builders below are plain f-string functions. string.Template
+# re-parses the template text and does dict lookups per placeholder on
+# every substitute() call; f-strings compile once to direct string
+# concatenation, and the hot analyze->design->generate loop runs them
+# per file and per retry. Schema/mapping JSON is machine-consumed, so
+# it is dumped compact — fewer bytes means fewer prompt tokens.
+
+# Invariant sections (reference examples, instructions) come first so
+# llama.cpp's longest-common-prefix prompt cache reuses their KV state
+# across calls; only the per-job schema suffix re-prefills. The two
+# per-language design-prompt prefixes are baked once at import time.
+_DESIGN_PROMPT_PREFIXES = {
+    language: f"""
+Map the following Logic Schema to modern Python design patterns.
+
+## Design Pattern Reference:
+{examples}
+
+## Instructions:
+1. For each legacy pattern, select the best modern equivalent
+2. Identify async/await opportunities
+3. Find vectorization candidates for loops
+4. Design context managers for resource handling
+5. Plan the Next.js component structure
+"""
+    for language, examples in (
+        ("cpp", CPP_TO_PYTHON_EXAMPLES),
+        ("java", JAVA_TO_PYTHON_EXAMPLES),
+        ("cpp:compressed", CPP_TO_PYTHON_EXAMPLES_COMPRESSED),
+        ("java:compressed", JAVA_TO_PYTHON_EXAMPLES_COMPRESSED),
+    )
+}
+
+# Above this many bytes of compact schema JSON, switch to the condensed
+# examples so the schema itself keeps most of the input budget
+_COMPRESSED_EXAMPLES_THRESHOLD = 4096
+
+
+def get_analysis_prompt(source_code: str, language: str, file_path: str) -> str:
+    """Build the analysis prompt for the Archaeologist."""
+    return f"""
+Analyze the following {language} code and extract the Logic Schema.
 
 ## Source Code:
-```$language
-$source_code
+```{language}
+{source_code}
 ```
 
 ## Instructions:
@@ -350,99 +492,67 @@ $source_code
 
 Output a JSON Logic Schema following this structure:
 ```json
-{
-    "source_file": "$file_path",
-    "language": "$language",
+{{
+    "source_file": "{file_path}",
+    "language": "{language}",
     "classes": [...],
     "functions": [...],
     "memory_allocations": [...],
-    "control_flow_graph": {...},
-    "call_graph": {...}
-}
+    "control_flow_graph": {{...}},
+    "call_graph": {{...}}
+}}
 ```
-""")
-
+"""
 
-DESIGN_PROMPT = Template("""
-Map the following Logic Schema to modern Python design patterns.
 
+def get_design_prompt(logic_schema: dict, language: str) -> str:
+    """Build the design prompt for the Architect."""
+    if language not in ("cpp", "java"):
+        language = "java"
+    schema_json = _dumps_compact(logic_schema)
+    if len(schema_json) > _COMPRESSED_EXAMPLES_THRESHOLD:
+        language = f"{language}:compressed"
+    prefix = _DESIGN_PROMPT_PREFIXES[language]
+    return f"""{prefix}
 ## Logic Schema:
 ```json
-$logic_schema
+{schema_json}
 ```
 
-## Design Pattern Reference:
-$pattern_examples
-
-## Instructions:
-1. For each legacy pattern, select the best modern equivalent
-2. Identify async/await opportunities
-3. Find vectorization candidates for loops
-4. Design context managers for resource handling
-5. Plan the Next.js component structure
-
 Output a Design Mapping with rationale.
-""")
+"""
 
 
-GENERATION_PROMPT = Template("""
+def get_generation_prompt(
+    design_mapping: dict,
+    flow_description: str,
+    previous_failures: list,
+    python_version: str = "3.11",
+    nextjs_version: str = "14",
+) -> str:
+    """Build the generation prompt for the Engineer."""
+    mapping_json = _dumps_compact(design_mapping)
+    failures_str = _dumps_compact(previous_failures) if previous_failures else "None"
+    return f"""
 Generate production Python code from this Design Mapping.
 
+## Requirements:
+- Python {python_version} with full type hints
+- Use async/await where indicated
+- Include comprehensive docstrings
+- Generate pytest test cases
+- Create Next.js {nextjs_version} components
+
 ## Design Mapping:
 ```json
-$design_mapping
+{mapping_json}
 ```
 
 ## Original Algorithm Flow:
-$flow_description
+{flow_description}
 
 ## Previous Failures (if any):
-$previous_failures
-
-## Requirements:
-- Python $python_version with full type hints
-- Use async/await where indicated
-- Include comprehensive docstrings
-- Generate pytest test cases
-- Create Next.js $nextjs_version components
+{failures_str}
 
 Generate complete, working code.
-""")
-
-
-def get_analysis_prompt(source_code: str, language: str, file_path: str) -> str:
-    """Build the analysis prompt for the Archaeologist."""
-    return ANALYSIS_PROMPT.substitute(
-        language=language,
-        source_code=source_code,
-        file_path=file_path,
-    )
-
-
-def get_design_prompt(logic_schema: dict, language: str) -> str:
-    """Build the design prompt for the Architect."""
-    import json
-    examples = CPP_TO_PYTHON_EXAMPLES if language == "cpp" else JAVA_TO_PYTHON_EXAMPLES
-    return DESIGN_PROMPT.substitute(
-        logic_schema=json.dumps(logic_schema, indent=2),
-        pattern_examples=examples,
-    )
-
-
-def get_generation_prompt(
-    design_mapping: dict,
-    flow_description: str,
-    previous_failures: list,
-    python_version: str = "3.11",
-    nextjs_version: str = "14",
-) -> str:
-    """Build the generation prompt for the Engineer."""
-    import json
-    failures_str = json.dumps(previous_failures, indent=2) if previous_failures else "None"
-    return GENERATION_PROMPT.substitute(
-        design_mapping=json.dumps(design_mapping, indent=2),
-        flow_description=flow_description,
-        previous_failures=failures_str,
-        python_version=python_version,
-        nextjs_version=nextjs_version,
-    )
+"""
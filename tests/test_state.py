@@ -3,6 +3,8 @@ LegacyLens - Unit Tests for Core State
 ======================================
 """
 
+import time
+
 import pytest
 from datetime import datetime
 
@@ -72,15 +74,18 @@ class TestAgentState:
     
     def test_initial_state_has_timestamp(self):
         """Test that started_at is set correctly."""
-        before = datetime.now().isoformat()
+        # Monotonic integers: immune to DST/wall-clock jumps, unlike
+        # lexicographic comparison of ISO strings
+        before = time.monotonic_ns()
         state = create_initial_state(
             legacy_source="code",
             source_file_path="test.cpp",
             source_language="cpp",
         )
-        after = datetime.now().isoformat()
-        
-        assert before <= state["started_at"] <= after
+        after = time.monotonic_ns()
+
+        assert before <= state["started_at_ns"] <= after
+        assert state["started_at"]  # ISO form still present for humans
         assert state["completed_at"] is None
 
 
@@ -100,9 +105,11 @@ class TestRefactorPhase:
         assert len(phases) == 6
     
     def test_phase_values(self):
-        """Test phase string values."""
+        """Test phase string values and integer codes."""
         assert RefactorPhase.ARCHAEOLOGY.value == "archaeology"
         assert RefactorPhase.COMPLETED.value == "completed"
+        assert RefactorPhase.ARCHAEOLOGY.code == 0
+        assert RefactorPhase.COMPLETED.code == 5
 
 
 class TestValidationStatus: